@@ -0,0 +1,138 @@
+"""
+Per-session memory and rerun cost of the variance.py item cart.
+
+Compares the previous session layout (list of 14-key dicts, a key -> dict
+map for duplicate checks and a one-row DataFrame for the lookup panel) with
+`cart.Cart` plus a (name, supplier) tuple for the lookup panel.
+
+Both numbers cover --sessions concurrent sessions. Memory is what each
+session keeps alive, including the cart's display frame. Rerun time cycles
+through all the sessions, the way a busy server interleaves them.
+
+    python benchmarks/bench_cart.py [--items 50 200 500] [--sessions 100] [--reruns 20]
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+
+from cart import Cart  # noqa: E402
+from duplicates import item_key  # noqa: E402
+
+OUTLET = "Shams Liwan"
+STAFF = "Staff Member"
+
+
+def make_items(n):
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    return [
+        {
+            "Date Submitted": now,
+            "Form Type": "Near Expiry",
+            "Barcode": str(6291000000000 + i),
+            "Item Name": f"Sample Item {i} 500g",
+            "Qty": 1 + i % 7,
+            "Cost": round(1.25 + i % 13, 2),
+            "Selling": round(2.5 + i % 17, 2),
+            "Amount": round((1.25 + i % 13) * (1 + i % 7), 2),
+            "GP%": 25.0,
+            "Expiry": "31-Dec-26",
+            "Supplier": f"Supplier {i % 40}",
+            "Remarks": "",
+            "Outlet": OUTLET,
+            "Staff Name": STAFF,
+        }
+        for i in range(n)
+    ]
+
+
+def legacy_session(items):
+    state = {"submitted_items": [], "item_keys": {}}
+    for item in items:
+        item = dict(item)
+        state["submitted_items"].append(item)
+        state["item_keys"][item_key(item)] = item
+    state["lookup_data"] = pd.DataFrame([{"Item Name": "Sample Item", "Supplier": "Supplier"}])
+    return state
+
+
+def lean_session(items):
+    state = {"submitted_items": Cart()}
+    for item in items:
+        state["submitted_items"].add(dict(item))
+    state["submitted_items"].frame()
+    state["lookup_data"] = ("Sample Item", "Supplier")
+    return state
+
+
+def retained_bytes(build, items, sessions):
+    """Average bytes kept alive per session state (tracemalloc, after gc)."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    kept = [build(items) for _ in range(sessions)]
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del kept
+    return size / sessions
+
+
+def legacy_rerun(state):
+    df = pd.DataFrame(state["submitted_items"])
+    options = [f"{i+1}. {item['Item Name']} ({item['Qty']} pcs)" for i, item in enumerate(state["submitted_items"])]
+    return df, options
+
+
+def lean_rerun(state):
+    items_cart = state["submitted_items"]
+    return items_cart.frame(), [items_cart.label(item_id) for item_id in items_cart.ids()]
+
+
+def rerun_ms(rerun, states, reruns):
+    """Average time of one rerun, with `reruns` rounds over all session states."""
+    start = time.perf_counter()
+    for _ in range(reruns):
+        for state in states:
+            rerun(state)
+    return (time.perf_counter() - start) * 1000 / (reruns * len(states))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--items", type=int, nargs="+", default=[50, 200, 500])
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--reruns", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    # Warm up pandas' lazily created internals so they aren't charged to a session
+    legacy_rerun(legacy_session(make_items(5)))
+    lean_rerun(lean_session(make_items(5)))
+
+    print(f"{args.sessions} sessions")
+    print(f"{'items':>6} | {'legacy KiB/session':>18} | {'lean KiB/session':>16} | {'saved':>6} | "
+          f"{'legacy ms/rerun':>15} | {'lean ms/rerun':>13}")
+    for n in args.items:
+        items = make_items(n)
+        legacy_kib = retained_bytes(legacy_session, items, args.sessions) / 1024
+        lean_kib = retained_bytes(lean_session, items, args.sessions) / 1024
+        legacy_states = [legacy_session(items) for _ in range(args.sessions)]
+        lean_states = [lean_session(items) for _ in range(args.sessions)]
+        legacy_ms = rerun_ms(legacy_rerun, legacy_states, args.reruns)
+        lean_ms = rerun_ms(lean_rerun, lean_states, args.reruns)
+        del legacy_states, lean_states
+        saved = (1 - lean_kib / legacy_kib) * 100 if legacy_kib else 0
+        print(f"{n:>6} | {legacy_kib:>18.1f} | {lean_kib:>16.1f} | {saved:>5.0f}% | "
+              f"{legacy_ms:>15.3f} | {lean_ms:>13.3f}")
+
+
+if __name__ == "__main__":
+    main()
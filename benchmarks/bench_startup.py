@@ -0,0 +1,190 @@
+"""
+Cold-start measurements for variance.py and managers.py.
+
+Every measurement runs in a fresh interpreter, so module caches don't carry
+over between apps or runs:
+
+* import     - time to import what the script imports before the login page
+               (module-level imports above the `logged_in` check);
+* first      - time for the first script run, i.e. the login page render
+               (AppTest, no browser);
+* heavy      - heavy modules the login page render imported itself. Imports
+               made by the app's background threads (module preload,
+               replicator, catalog watcher) don't delay the render and are
+               left out, so the column doesn't depend on their timing;
+* dashboard  - after `--typing-delay` seconds on the login page, time from
+               clicking Login to the rendered dashboard.
+
+Sheets credentials are dummies, so replication fails fast and the apps run
+from the local mirror. Nothing talks to Google. The mirror, shared Arrow cache
+and catalog directory all live in a temp dir per run, so nothing is written to
+the working tree and no real ItemSearchList_*.xlsx is parsed.
+
+    python benchmarks/bench_startup.py [--runs 3] [--typing-delay 2] [--json]
+"""
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APPS = {
+    "variance.py": {"inputs": {0: "almadina", 1: "123123"}, "select": None},
+    "managers.py": {"inputs": {0: "1234512345"}, "select": "Logistics"},
+}
+HEAVY_MODULES = ("pandas", "numpy", "pyarrow", "gspread", "google.oauth2.service_account", "openpyxl")
+BACKGROUND_THREADS = ("module-preload", "sheets-replicator", "catalog-watcher")
+DUMMY_SERVICE_ACCOUNT = {"type": "service_account", "client_email": "bench@example.invalid"}
+
+
+def pre_login_imports(app_path):
+    """Module-level imports that run before the script's `logged_in` check."""
+    with open(app_path, encoding="utf-8") as fh:
+        tree = ast.parse(fh.read())
+    names = []
+    for node in tree.body:
+        if isinstance(node, ast.If) and "logged_in" in ast.unparse(node.test):
+            break
+        if isinstance(node, ast.Import):
+            names.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            names.append(node.module)
+    return names
+
+
+# ================================
+# CHILD PROCESSES
+# ================================
+def child_import(names):
+    sys.path.insert(0, ROOT)
+    start = time.perf_counter()
+    for name in names:
+        __import__(name)
+    elapsed = time.perf_counter() - start
+    print(json.dumps({"import": elapsed, "heavy": [m for m in HEAVY_MODULES if m in sys.modules]}))
+
+
+class ImportRecorder:
+    """Meta path hook noting which thread first imported each heavy module; never loads anything."""
+
+    def __init__(self):
+        self.threads = {}
+
+    def find_spec(self, name, path=None, target=None):
+        if name in HEAVY_MODULES and name not in sys.modules:
+            self.threads.setdefault(name, threading.current_thread().name)
+        return None
+
+    def foreground(self):
+        return [m for m in HEAVY_MODULES if m in self.threads and self.threads[m] not in BACKGROUND_THREADS]
+
+
+def child_render(app, typing_delay):
+    recorder = ImportRecorder()
+    sys.meta_path.insert(0, recorder)
+    from streamlit.testing.v1 import AppTest
+
+    config = APPS[app]
+    at = AppTest.from_file(os.path.join(ROOT, app), default_timeout=120)
+    at.secrets["google_service_account"] = DUMMY_SERVICE_ACCOUNT
+
+    start = time.perf_counter()
+    at.run()
+    first = time.perf_counter() - start
+    heavy = recorder.foreground()
+
+    # The user types their credentials meanwhile; background warm-up runs
+    time.sleep(typing_delay)
+    if config["select"]:
+        at.selectbox[0].select(config["select"])
+    for index, value in config["inputs"].items():
+        at.text_input[index].input(value)
+    at.run()
+    start = time.perf_counter()
+    at.button[0].click()
+    at.run()
+    if not at.session_state["logged_in"]:
+        raise SystemExit(f"{app}: login did not succeed")
+    at.run()  # managers.py logs in from a callback; the dashboard renders on this run
+    dashboard = time.perf_counter() - start
+
+    print(json.dumps({
+        "first": first,
+        "heavy": heavy,
+        "dashboard": dashboard,
+        "exceptions": [e.value for e in at.exception],
+    }))
+
+
+def run_child(args, env):
+    out = subprocess.run(
+        [sys.executable, os.path.abspath(__file__)] + args,
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+# ================================
+# DRIVER
+# ================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure import time and time-to-first-render of both apps.")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh-process runs per app (median reported)")
+    parser.add_argument("--typing-delay", type=float, default=2.0, help="Seconds spent on the login page")
+    parser.add_argument("--json", action="store_true", help="Print one JSON object per app instead of a table")
+    parser.add_argument("--child", choices=["import", "render"], help=argparse.SUPPRESS)
+    parser.add_argument("--app", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child == "import":
+        return child_import(pre_login_imports(os.path.join(ROOT, args.app)))
+    if args.child == "render":
+        return child_render(args.app, args.typing_delay)
+
+    results = []
+    for app in APPS:
+        samples = []
+        for _ in range(args.runs):
+            with tempfile.TemporaryDirectory() as tmp:
+                env = dict(
+                    os.environ,
+                    LOCAL_MIRROR_PATH=os.path.join(tmp, "mirror.sqlite3"),
+                    SHARED_CACHE_DIR=os.path.join(tmp, "shared_cache"),
+                    CATALOG_DIR=tmp,
+                )
+                imported = run_child(["--child", "import", "--app", app], env)
+                rendered = run_child(
+                    ["--child", "render", "--app", app, "--typing-delay", str(args.typing_delay)], env
+                )
+            samples.append((imported, rendered))
+        results.append({
+            "app": app,
+            "import_s": statistics.median(s[0]["import"] for s in samples),
+            "first_render_s": statistics.median(s[1]["first"] for s in samples),
+            "dashboard_s": statistics.median(s[1]["dashboard"] for s in samples),
+            "heavy_at_import": samples[-1][0]["heavy"],
+            "heavy_at_first_render": samples[-1][1]["heavy"],
+            "exceptions": samples[-1][1]["exceptions"],
+        })
+
+    if args.json:
+        for result in results:
+            print(json.dumps(result))
+        return
+
+    print(f"{'app':<12} | {'import s':>8} | {'first render s':>14} | {'dashboard s':>11} | heavy modules at first render")
+    for r in results:
+        print(f"{r['app']:<12} | {r['import_s']:>8.3f} | {r['first_render_s']:>14.3f} | {r['dashboard_s']:>11.3f} | "
+              f"{', '.join(r['heavy_at_first_render']) or '-'}")
+        if r["exceptions"]:
+            print(f"  ! {r['app']} raised: {r['exceptions']}")
+
+
+if __name__ == "__main__":
+    main()
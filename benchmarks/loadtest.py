@@ -0,0 +1,527 @@
+"""
+Load test for variance.py and managers.py against an in-memory Sheets stand-in.
+
+Each `--outlets` level runs in a fresh interpreter that plays one Streamlit
+server. Inside it, these sessions run concurrently on threads, driven
+headlessly through Streamlit's AppTest:
+
+* outlet sessions:  login -> (staff name, barcode scans, add items, submit) x rounds
+* manager sessions: login -> (filter, search, save one edit) x rounds
+
+All sessions share the apps' process-wide caches, the local mirror and its
+replicator, just as in a real server. Only Google Sheets is replaced, by
+`FakeSheets`, which counts every API call and sleeps `--api-latency` per
+call.
+
+AppTest swaps process globals (runtime, config, secrets) on every run, so
+script runs are serialised by one lock. A Streamlit server mostly
+serialises CPU-bound reruns on the GIL anyway. Per-action latency therefore
+includes the time spent queued behind other sessions, and "busy %" (share of
+wall time some script was running) shows how close the server is to
+saturation. Replication and Sheets I/O run outside the lock.
+
+Reported per level: throughput, busy %, per-action latency percentiles, API
+calls by method, and how long the replicator took to push everything to the
+fake sheet after the last session finished ("drain").
+
+    python benchmarks/loadtest.py [--outlets 1 4 16] [--managers 2] [--items 5]
+                                  [--rounds 2] [--api-latency 0.1] [--json]
+"""
+import argparse
+import ast
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+VARIANCE = os.path.join(ROOT, "variance.py")
+MANAGERS = os.path.join(ROOT, "managers.py")
+DUMMY_SERVICE_ACCOUNT = {"type": "service_account", "client_email": "loadtest@example.invalid"}
+MANAGER_EDITABLE = ["Action Took", "Action Took Date", "Supplier Name"]
+FORM_TYPES = ["Expiry", "Damages", "Near Expiry"]
+BARCODE_BASE = 6291000000000
+
+
+def app_literal(path, name):
+    """Value of a module-level literal assignment (outlet lists, passwords) in an app script."""
+    with open(path, encoding="utf-8") as fh:
+        tree = ast.parse(fh.read())
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(getattr(t, "id", None) == name for t in node.targets):
+            return ast.literal_eval(node.value)
+    raise KeyError(f"{name} not found in {os.path.basename(path)}")
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+# ================================
+# FAKE GOOGLE SHEETS
+# ================================
+class FakeWorksheet:
+    """The gspread Worksheet calls the apps make, on an in-memory grid."""
+
+    def __init__(self, sheets, rows):
+        self.sheets = sheets
+        self.rows = rows
+
+    def get_all_values(self):
+        self.sheets.call("get_all_values")
+        with self.sheets.lock:
+            return [list(row) for row in self.rows]
+
+    def row_values(self, index):
+        self.sheets.call("row_values")
+        with self.sheets.lock:
+            return list(self.rows[index - 1]) if len(self.rows) >= index else []
+
+    def append_row(self, row):
+        self.sheets.call("append_row")
+        with self.sheets.lock:
+            self.rows.append([str(value) for value in row])
+
+    def append_rows(self, rows):
+        self.sheets.call("append_rows")
+        with self.sheets.lock:
+            self.rows.extend([str(value) for value in row] for row in rows)
+
+    def batch_update(self, updates):
+        from gspread.utils import a1_to_rowcol
+
+        self.sheets.call("batch_update")
+        with self.sheets.lock:
+            for update in updates:
+                r, c = a1_to_rowcol(update["range"])
+                row = self.rows[r - 1]
+                row.extend([""] * (c - len(row)))
+                row[c - 1] = update["values"][0][0]
+
+    def delete_rows(self, start, end=None):
+        self.sheets.call("delete_rows")
+        with self.sheets.lock:
+            del self.rows[start - 1:(end or start)]
+
+
+class FakeSheets:
+    """Stands in for the gspread client and spreadsheet; counts calls and adds latency."""
+
+    def __init__(self, worksheets, latency=0.0):
+        self.lock = threading.Lock()
+        self.calls = Counter()
+        self.latency = latency
+        self.worksheets = {name: FakeWorksheet(self, rows) for name, rows in worksheets.items()}
+
+    def call(self, method):
+        with self.lock:
+            self.calls[method] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def open_by_url(self, url):
+        self.call("open_by_url")
+        return self
+
+    def worksheet(self, name):
+        self.call("worksheet")
+        return self.worksheets[name]
+
+    def install(self):
+        """Routes `gspread.authorize` (and the credential parsing before it) to this fake."""
+        import gspread
+        from google.oauth2.service_account import Credentials
+
+        def authorize(credentials, *args, **kwargs):
+            self.call("authorize")
+            return self
+
+        gspread.authorize = authorize
+        Credentials.from_service_account_info = classmethod(lambda cls, info, **kwargs: object())
+
+
+def seed_items(headers, outlets, barcodes, count, rng):
+    """Items rows from the last 60 days, spread over the outlets."""
+    today = date.today()
+    rows = [list(headers)]
+    for i in range(count):
+        submitted = today - timedelta(days=rng.randint(1, 60))
+        qty, cost = rng.randint(1, 12), round(rng.uniform(0.5, 40), 2)
+        record = {
+            "Date Submitted": f"{submitted} {rng.randint(8, 22):02d}:{rng.randint(0, 59):02d}:00",
+            "Form Type": rng.choice(FORM_TYPES),
+            "Barcode": rng.choice(barcodes),
+            "Item Name": f"Catalog Item {i % 997}",
+            "Qty": qty,
+            "Cost": cost,
+            "Selling": round(cost * 1.3, 2),
+            "Amount": round(qty * cost, 2),
+            "GP%": 30.0,
+            "Expiry": (submitted + timedelta(days=rng.randint(0, 120))).strftime("%d-%b-%y"),
+            "Supplier": f"Supplier {i % 40}",
+            "Outlet": outlets[i % len(outlets)],
+            "Staff Name": "Seed Staff",
+        }
+        rows.append([str(record.get(col, "")) for col in headers])
+    return rows
+
+
+def write_catalog(directory, size):
+    """An ItemSearchList export with `size` barcodes; returns the barcodes."""
+    import pandas as pd
+
+    barcodes = [str(BARCODE_BASE + i) for i in range(size)]
+    pd.DataFrame({
+        "Item Bar Code": barcodes,
+        "Item Name": [f"Catalog Item {i}" for i in range(size)],
+        "LP Supplier": [f"Supplier {i % 40}" for i in range(size)],
+    }).to_excel(os.path.join(directory, "ItemSearchList_loadtest.xlsx"), index=False)
+    return barcodes
+
+
+# ================================
+# SESSIONS
+# ================================
+class SerialisedRuns:
+    """Routes every AppTest script run through one lock and totals the time spent running."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.busy = 0.0
+
+    def install(self):
+        from streamlit.testing.v1 import AppTest
+
+        original = AppTest._run
+
+        def _run(at, *args, **kwargs):
+            with self.lock:
+                start = time.perf_counter()
+                try:
+                    return original(at, *args, **kwargs)
+                finally:
+                    self.busy += time.perf_counter() - start
+
+        AppTest._run = _run
+
+
+class Recorder:
+    """Thread-safe latency samples per action, plus errors."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.errors = []
+        self.counts = Counter()
+
+    @contextmanager
+    def timed(self, action):
+        start = time.perf_counter()
+        yield
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            self.samples[action].append(elapsed)
+
+    def count(self, what, n=1):
+        with self.lock:
+            self.counts[what] += n
+
+    def check(self, at, where):
+        """Records script exceptions from the last run; returns True if there were none."""
+        if at.exception:
+            with self.lock:
+                self.errors.append(f"{where}: {at.exception[0].value}")
+            return False
+        return True
+
+
+def by_label(elements, text):
+    for element in elements:
+        if text in element.label:
+            return element
+    raise LookupError(f"no widget labelled '{text}' on the page")
+
+
+def outlet_session(rec, session_id, outlet, username, password, barcodes, args):
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(session_id)
+    at = AppTest.from_file(VARIANCE, default_timeout=args.timeout)
+    at.secrets["google_service_account"] = DUMMY_SERVICE_ACCOUNT
+    at.run()
+    at.text_input[0].input(username)
+    at.selectbox[0].select(outlet)
+    at.text_input[1].input(password)
+    with rec.timed("outlet.login"):
+        at.button[0].click().run()
+    if not rec.check(at, "outlet.login") or not at.session_state["logged_in"]:
+        return
+
+    for _ in range(args.rounds):
+        by_label(at.text_input, "Staff Name").input(f"Staff {session_id}").run()
+        for barcode in rng.sample(barcodes, args.items):
+            time.sleep(args.think)
+            by_label(at.text_input, "Barcode Lookup").input(barcode)
+            with rec.timed("outlet.scan"):
+                by_label(at.button, "Search").click().run()
+            if not at.session_state["barcode_found"]:
+                by_label(at.text_input, "Item Name (Manual)").input(f"Unlisted {barcode}").run()
+            time.sleep(args.think)
+            with rec.timed("outlet.add"):
+                by_label(at.button, "Add to List").click().run()
+            if not rec.check(at, "outlet.add"):
+                return
+
+        queued = len(at.session_state["submitted_items"])
+        time.sleep(args.think)
+        with rec.timed("outlet.submit"):
+            by_label(at.button, "Submit All").click().run()
+        if not rec.check(at, "outlet.submit"):
+            return
+        if len(at.session_state["submitted_items"]) == 0:
+            rec.count("items submitted", queued)
+        else:
+            rec.count("submits rejected")
+
+
+def edit_and_click(at, button, column, value):
+    """
+    AppTest can't type into st.data_editor, so the edit is sent as the
+    editor's widget state together with the button click.
+    """
+    editor = next(d for d in at.dataframe if d.proto.editing_mode)
+    button.click()
+    states = at._tree.get_widget_states()
+    state = states.widgets.add()
+    state.id = editor.proto.id
+    state.string_value = json.dumps(
+        {"edited_rows": {"0": {column: value}}, "added_rows": [], "deleted_rows": []}
+    )
+    return at._run(states)
+
+
+def manager_session(rec, session_id, outlet, password, args):
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(-session_id)
+    at = AppTest.from_file(MANAGERS, default_timeout=args.timeout)
+    at.secrets["google_service_account"] = DUMMY_SERVICE_ACCOUNT
+    at.run()
+    at.selectbox[0].select(outlet)
+    at.text_input[0].input(password).run()
+    with rec.timed("manager.login"):
+        at.button[0].click().run()
+        at.run()  # the login callback runs first; the dashboard renders on this run
+    if not rec.check(at, "manager.login") or not at.session_state["logged_in"]:
+        return
+
+    column = "Supplier Name" if outlet.lower() == "logistics" else "Action Took"
+    for round_no in range(args.rounds):
+        time.sleep(args.think)
+        with rec.timed("manager.filter"):
+            by_label(at.date_input, "From").set_value(date.today() - timedelta(days=rng.randint(7, 60))).run()
+        time.sleep(args.think)
+        with rec.timed("manager.search"):
+            by_label(at.text_input, "Search").input(f"Item {rng.randint(1, 9)}").run()
+        by_label(at.text_input, "Search").input("").run()
+        if not rec.check(at, "manager.search"):
+            return
+
+        save = [b for b in at.button if "Submit Changes" in b.label]
+        if not save:
+            rec.count("saves skipped (no rows)")
+            continue
+        time.sleep(args.think)
+        with rec.timed("manager.save"):
+            edit_and_click(at, save[0], column, f"Checked {session_id}.{round_no}")
+        if rec.check(at, "manager.save"):
+            rec.count("saves")
+
+
+# ================================
+# CHILD: ONE LEVEL IN ONE PROCESS
+# ================================
+def run_level(args):
+    from cart import CART_COLUMNS
+    from local_mirror import LocalMirror, MIRROR_PATH
+
+    rng = random.Random(args.seed)
+    outlets = app_literal(VARIANCE, "outlets")
+    variance_password = app_literal(VARIANCE, "password")
+    manager_passwords = app_literal(MANAGERS, "outlet_passwords")
+    barcodes = write_catalog(os.environ["CATALOG_DIR"], args.catalog_size)
+    # A share of scans misses the catalog and goes through manual entry
+    scan_pool = barcodes[: max(args.items * 4, 100)] + [str(BARCODE_BASE - i - 1) for i in range(20)]
+
+    fake = FakeSheets({
+        "Items": seed_items(list(CART_COLUMNS) + MANAGER_EDITABLE, outlets, barcodes, args.seed_rows, rng),
+        "Feedback": [],
+    }, latency=args.api_latency)
+    fake.install()
+
+    runs = SerialisedRuns()
+    runs.install()
+
+    manager_logins = [(name, pwd) for name, pwd in manager_passwords.items()]
+    rec = Recorder()
+    jobs = []
+    for i in range(args.level):
+        jobs.append((outlet_session, (rec, i, outlets[i % len(outlets)], "almadina", variance_password,
+                                      scan_pool, args)))
+    for i in range(args.managers):
+        name, pwd = manager_logins[i % len(manager_logins)]
+        jobs.append((manager_session, (rec, i, name, pwd, args)))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+        futures = [pool.submit(fn, *fn_args) for fn, fn_args in jobs]
+        for future in futures:
+            try:
+                future.result()
+            except Exception as e:
+                rec.errors.append(f"{type(e).__name__}: {e}")
+    wall = time.perf_counter() - start
+
+    # Wait for the replicator to push the queued rows and edits to the sheet
+    mirror = LocalMirror(MIRROR_PATH)
+    drain_start = time.perf_counter()
+    while time.perf_counter() - drain_start < args.drain_timeout:
+        status = mirror.status()
+        if not status["pending_rows"] and not status["pending_edits"]:
+            break
+        time.sleep(0.2)
+    drain = time.perf_counter() - drain_start
+    status = mirror.status()
+
+    actions = {
+        action: {
+            "n": len(samples),
+            "p50_ms": percentile(samples, 50) * 1000,
+            "p95_ms": percentile(samples, 95) * 1000,
+            "p99_ms": percentile(samples, 99) * 1000,
+            "mean_ms": statistics.mean(samples) * 1000,
+        }
+        for action, samples in sorted(rec.samples.items())
+    }
+    total_actions = sum(a["n"] for a in actions.values())
+    api_calls = sum(fake.calls.values())
+    elapsed = wall + drain
+    return {
+        "outlets": args.level,
+        "managers": args.managers,
+        "wall_s": wall,
+        "actions_per_s": total_actions / wall if wall else 0.0,
+        "busy_pct": runs.busy / wall * 100 if wall else 0.0,
+        "items_per_s": rec.counts["items submitted"] / wall if wall else 0.0,
+        "drain_s": drain,
+        "unsynced_rows": status["pending_rows"],
+        "unsynced_edits": status["pending_edits"],
+        "api_calls": api_calls,
+        "api_calls_per_min": api_calls / elapsed * 60 if elapsed else 0.0,
+        "api_by_method": dict(fake.calls),
+        "counts": dict(rec.counts),
+        "actions": actions,
+        "errors": rec.errors[:10],
+        "error_count": len(rec.errors),
+    }
+
+
+# ================================
+# DRIVER
+# ================================
+def print_report(results):
+    print(f"{'outlets':>7} | {'managers':>8} | {'wall s':>7} | {'actions/s':>9} | {'items/s':>7} | {'busy %':>6} | "
+          f"{'drain s':>7} | {'API calls':>9} | {'API/min':>7} | errors")
+    for r in results:
+        print(f"{r['outlets']:>7} | {r['managers']:>8} | {r['wall_s']:>7.2f} | {r['actions_per_s']:>9.2f} | "
+              f"{r['items_per_s']:>7.2f} | {r['busy_pct']:>6.0f} | {r['drain_s']:>7.2f} | {r['api_calls']:>9} | "
+              f"{r['api_calls_per_min']:>7.1f} | {r['error_count']}")
+
+    print()
+    print(f"{'outlets':>7} | {'action':<15} | {'n':>5} | {'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8}")
+    for r in results:
+        for action, a in r["actions"].items():
+            print(f"{r['outlets']:>7} | {action:<15} | {a['n']:>5} | {a['p50_ms']:>8.1f} | "
+                  f"{a['p95_ms']:>8.1f} | {a['p99_ms']:>8.1f}")
+
+    print()
+    for r in results:
+        methods = ", ".join(f"{m}={n}" for m, n in sorted(r["api_by_method"].items()))
+        print(f"{r['outlets']:>3} outlets: API {methods or '-'}; {r['counts']}")
+        if r["unsynced_rows"] or r["unsynced_edits"]:
+            print(f"    ! {r['unsynced_rows']} row(s) / {r['unsynced_edits']} edit(s) still unsynced")
+        for error in r["errors"]:
+            print(f"    ! {error}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent multi-outlet load test of both apps against fake Sheets.")
+    parser.add_argument("--outlets", type=int, nargs="+", default=[1, 4, 16], help="Outlet sessions per level")
+    parser.add_argument("--managers", type=int, default=2, help="Manager sessions running alongside each level")
+    parser.add_argument("--items", type=int, default=5, help="Barcodes scanned and added per outlet round")
+    parser.add_argument("--rounds", type=int, default=2, help="Workflow repetitions per session after login")
+    parser.add_argument("--think", type=float, default=0.0, help="Seconds of user think time between actions")
+    parser.add_argument("--api-latency", type=float, default=0.1, help="Seconds added to every fake Sheets call")
+    parser.add_argument("--seed-rows", type=int, default=2000, help="Existing Items rows in the fake sheet")
+    parser.add_argument("--catalog-size", type=int, default=5000, help="Barcodes in the generated catalog export")
+    parser.add_argument("--sync-interval", type=int, default=30, help="Replicator interval (MIRROR_SYNC_INTERVAL)")
+    parser.add_argument("--drain-timeout", type=float, default=120.0, help="Max seconds to wait for replication")
+    parser.add_argument("--timeout", type=float, default=120.0, help="AppTest per-run timeout in seconds")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", action="store_true", help="Print one JSON object per level instead of tables")
+    parser.add_argument("--level", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.level is not None:
+        sys.path.insert(0, ROOT)
+        print(json.dumps(run_level(args)))
+        return
+
+    passthrough = [
+        "--managers", str(args.managers), "--items", str(args.items), "--rounds", str(args.rounds),
+        "--think", str(args.think), "--api-latency", str(args.api_latency),
+        "--seed-rows", str(args.seed_rows), "--catalog-size", str(args.catalog_size),
+        "--drain-timeout", str(args.drain_timeout), "--timeout", str(args.timeout), "--seed", str(args.seed),
+    ]
+    results = []
+    for level in args.outlets:
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(
+                os.environ,
+                LOCAL_MIRROR_PATH=os.path.join(tmp, "mirror.sqlite3"),
+                MIRROR_SYNC_INTERVAL=str(args.sync_interval),
+                SHARED_CACHE_DIR=os.path.join(tmp, "shared_cache"),
+                ITEMS_ARCHIVE_DIR=os.path.join(tmp, "archive"),
+                CATALOG_DIR=tmp,
+            )
+            started = datetime.now().strftime("%H:%M:%S")
+            print(f"[{started}] {level} outlet(s) + {args.managers} manager(s)...", file=sys.stderr)
+            out = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--level", str(level)] + passthrough,
+                cwd=ROOT, env=env, capture_output=True, text=True,
+            )
+            if out.returncode:
+                raise SystemExit(f"level {level} failed:\n{out.stderr[-3000:]}")
+            results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    if args.json:
+        for result in results:
+            print(json.dumps(result))
+        return
+    print_report(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Compact per-session item cart for variance.py.
+
+Each staff session used to keep its list as 14-key dicts and rebuild a
+DataFrame and the delete options from them on every rerun. `Cart` keeps
+the entries column-wise, one list per CART_COLUMNS entry, with a per-cart
+item ID for every position:
+
+* add appends to the column lists, merge overwrites one position, and
+  delete by ID blanks its position (O(1); the lists are compacted once
+  blanks outnumber live entries);
+* the duplicate key -> item IDs map is kept up to date as entries change,
+  not rebuilt (one key can hold several entries when the same item was
+  scanned at different prices), and delete labels are formatted on demand;
+* the display DataFrame is built lazily from the column lists after a
+  change and kept on the cart, so reruns in between reuse it no matter how
+  many sessions the server holds.
+
+See benchmarks/bench_cart.py for the per-session memory comparison.
+"""
+from duplicates import item_key, merge_item
+
+CART_COLUMNS = (
+    "Date Submitted", "Form Type", "Barcode", "Item Name", "Qty", "Cost", "Selling",
+    "Amount", "GP%", "Expiry", "Supplier", "Remarks", "Outlet", "Staff Name",
+)
+_QTY = CART_COLUMNS.index("Qty")
+_NAME = CART_COLUMNS.index("Item Name")
+
+
+class Cart:
+    """Ordered item ID -> entry mapping stored as column lists, with incrementally maintained views."""
+
+    __slots__ = ("_ids", "_columns", "_pos", "_keys", "_next_id", "_frame")
+
+    def __init__(self):
+        self._ids = []      # item ID per position; None where an entry was deleted
+        self._columns = tuple([] for _ in CART_COLUMNS)
+        self._pos = {}      # item ID -> position in the lists
+        self._keys = {}     # duplicate key -> item IDs holding it, oldest first
+        self._next_id = 1
+        self._frame = None  # display DataFrame, built on demand and dropped on change
+
+    def __len__(self):
+        return len(self._pos)
+
+    def __bool__(self):
+        return bool(self._pos)
+
+    def _row(self, pos):
+        return [column[pos] for column in self._columns]
+
+    def _live(self):
+        return [pos for pos, item_id in enumerate(self._ids) if item_id is not None]
+
+    def _compact(self):
+        live = self._live()
+        self._ids = [self._ids[pos] for pos in live]
+        self._columns = tuple([column[pos] for pos in live] for column in self._columns)
+        self._pos = {item_id: pos for pos, item_id in enumerate(self._ids)}
+
+    # ---------- changes ----------
+    def add(self, item):
+        """Adds an item dict (CART_COLUMNS keys); returns its item ID."""
+        item_id = self._next_id
+        self._next_id += 1
+        self._pos[item_id] = len(self._ids)
+        self._ids.append(item_id)
+        for column, col in zip(self._columns, CART_COLUMNS):
+            column.append(item[col])
+        self._keys.setdefault(item_key(item), []).append(item_id)
+        self._frame = None
+        return item_id
+
+    def merge(self, item_id, item):
+        """Folds `item` into the entry `item_id` (Qty summed); returns the merged dict."""
+        merged = merge_item(self.get(item_id), item)
+        pos = self._pos[item_id]
+        for column, col in zip(self._columns, CART_COLUMNS):
+            column[pos] = merged[col]
+        self._frame = None
+        return merged
+
+    def remove(self, item_id):
+        pos = self._pos.pop(item_id)
+        key = item_key(self._get_at(pos))
+        holders = self._keys[key]
+        holders.remove(item_id)
+        if not holders:
+            del self._keys[key]
+        self._ids[pos] = None
+        for column in self._columns:
+            column[pos] = None
+        self._frame = None
+        if len(self._ids) - len(self._pos) > max(len(self._pos), 8):
+            self._compact()
+
+    def clear(self):
+        self.__init__()
+
+    # ---------- reads ----------
+    def find(self, key):
+        """Item IDs already holding duplicate `key`, oldest first (empty when none)."""
+        return list(self._keys.get(key, ()))
+
+    def _get_at(self, pos):
+        return dict(zip(CART_COLUMNS, self._row(pos)))
+
+    def get(self, item_id):
+        return self._get_at(self._pos[item_id])
+
+    def ids(self):
+        return list(self._pos)
+
+    def label(self, item_id):
+        """Delete-selector label, e.g. "#3 Milk 1L (2 pcs)"."""
+        pos = self._pos[item_id]
+        return f"#{item_id} {self._columns[_NAME][pos]} ({self._columns[_QTY][pos]} pcs)"
+
+    def items(self):
+        return [self._get_at(pos) for pos in self._live()]
+
+    def rows(self):
+        """Value lists in CART_COLUMNS order, ready for `append_rows`."""
+        return [self._row(pos) for pos in self._live()]
+
+    def frame(self):
+        """Display DataFrame (indexed by item ID); rebuilt from the column lists only after a change."""
+        if self._frame is None:
+            import pandas as pd
+
+            if len(self._ids) != len(self._pos):
+                self._compact()
+            self._frame = pd.DataFrame(
+                dict(zip(CART_COLUMNS, self._columns)), index=pd.Index(self._ids, name="#")
+            )
+        return self._frame
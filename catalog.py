@@ -0,0 +1,197 @@
+"""
+Hot-reloadable item catalog for the barcode lookup in variance.py.
+
+`CatalogManager` watches CATALOG_DIR for item-list exports (the newest file
+matching CATALOG_PATTERN wins). When a new or changed export appears, a
+background thread parses it and builds the barcode index, then swaps the
+finished `CatalogSnapshot` in with a single attribute assignment. Lookups
+always read a complete snapshot (old or new) and never wait for a reload.
+
+The parsed catalog is kept in the host-wide shared cache (shared_cache.py),
+so each export is parsed once per host and every worker process maps the
+same Arrow file instead of holding its own DataFrame and index.
+
+Drop a new export into the folder to publish it, e.g.:
+
+    ItemSearchList_15112025_0930.xlsx
+"""
+import glob
+import os
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime
+
+from shared_cache import SharedArrowCache, version_key
+
+CATALOG_DIR = os.environ.get("CATALOG_DIR", ".")
+CATALOG_PATTERN = os.environ.get("CATALOG_PATTERN", "ItemSearchList_*.xlsx")
+CATALOG_POLL_SECONDS = int(os.environ.get("CATALOG_POLL_SECONDS", "60"))
+
+BARCODE_COL = "Item Bar Code"
+REQUIRED_COLUMNS = [BARCODE_COL, "Item Name", "LP Supplier"]
+
+
+class CatalogSnapshot:
+    """
+    One fully built catalog: an Arrow table sorted by barcode (one row per
+    barcode), usually memory-mapped from the shared cache.
+    """
+
+    __slots__ = ("table", "_barcodes", "_names", "_suppliers", "source", "signature", "loaded_at")
+
+    def __init__(self, table, source, signature):
+        self.table = table
+        self._barcodes = _Column(table, BARCODE_COL)
+        self._names = _Column(table, "Item Name")
+        self._suppliers = _Column(table, "LP Supplier")
+        self.source = source
+        self.signature = signature
+        self.loaded_at = datetime.now()
+
+    def __len__(self):
+        return len(self._barcodes)
+
+    @property
+    def df(self):
+        """The catalog as a DataFrame (a copy; built on demand)."""
+        return self.table.to_pandas() if self.table is not None else None
+
+    def lookup(self, barcode):
+        """Returns (item name, supplier) for `barcode`, or None. O(log n), no copies."""
+        barcode = str(barcode).strip()
+        i = bisect_left(self._barcodes, barcode)
+        if i < len(self._barcodes) and self._barcodes[i] == barcode:
+            return (str(self._names[i]), str(self._suppliers[i]))
+        return None
+
+
+class _Column:
+    """Sequence view over one string column of an Arrow table, for bisect."""
+
+    __slots__ = ("values",)
+
+    def __init__(self, table, name):
+        self.values = table.column(name) if table is not None else ()
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, i):
+        return self.values[i].as_py()
+
+
+EMPTY_SNAPSHOT = CatalogSnapshot(None, None, None)
+
+
+def _signature(path):
+    stat = os.stat(path)
+    return (path, stat.st_mtime_ns, stat.st_size)
+
+
+def build_catalog_table(path):
+    """
+    Parses an export into an Arrow table sorted by barcode (first row wins
+    for repeated barcodes; rows without a barcode are dropped).
+    """
+    import pandas as pd
+    import pyarrow as pa
+
+    df = pd.read_excel(path, dtype={BARCODE_COL: str})
+    # Ensure column names are clean
+    df.columns = df.columns.str.strip()
+    missing = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if missing:
+        raise ValueError(f"Missing critical column(s) {missing} in {os.path.basename(path)}")
+
+    df = df[df[BARCODE_COL].notna()].copy()
+    df[BARCODE_COL] = df[BARCODE_COL].astype(str).str.strip()
+    df = df.drop_duplicates(BARCODE_COL, keep="first").sort_values(BARCODE_COL, kind="stable")
+    # Mixed-type object columns don't convert to Arrow; the lookup only needs text anyway
+    for col in df.columns:
+        if df[col].dtype == object:
+            df[col] = df[col].astype(str)
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def build_snapshot(path, cache=None):
+    """
+    Snapshot for the export at `path`. With a `SharedArrowCache`, the table
+    is built by the first process that needs this version of the export and
+    memory-mapped by all others.
+    """
+    signature = _signature(path)
+    if cache is None:
+        table = build_catalog_table(path)
+    else:
+        table = cache.get_or_build("catalog", version_key(*signature), lambda: build_catalog_table(path))
+    return CatalogSnapshot(table, path, signature)
+
+
+class CatalogManager:
+    """Keeps the current `CatalogSnapshot` and reloads it in the background when the export changes."""
+
+    def __init__(self, directory=CATALOG_DIR, pattern=CATALOG_PATTERN, poll_seconds=CATALOG_POLL_SECONDS,
+                 shared=True):
+        self.directory = directory
+        self.pattern = pattern
+        self.poll_seconds = poll_seconds
+        self.snapshot = EMPTY_SNAPSHOT
+        self.last_error = ""
+        self._cache = SharedArrowCache() if shared else None
+        self._thread = None
+        self._reload_lock = threading.Lock()
+        self._ready = threading.Event()  # set once the first load attempt finished
+
+    def latest_export(self):
+        """Newest export in the watched directory, or None."""
+        paths = glob.glob(os.path.join(self.directory, self.pattern))
+        return max(paths, key=os.path.getmtime) if paths else None
+
+    def lookup(self, barcode):
+        return self.snapshot.lookup(barcode)
+
+    def reload_if_changed(self):
+        """Builds and swaps in a new snapshot if the newest export differs. Returns True on swap."""
+        with self._reload_lock:
+            path = self.latest_export()
+            if path is None:
+                if self.snapshot is EMPTY_SNAPSHOT:
+                    self.last_error = f"No catalog export matching '{self.pattern}' in '{self.directory}'."
+                return False
+            try:
+                if _signature(path) == self.snapshot.signature:
+                    return False
+                snapshot = build_snapshot(path, self._cache)
+            except Exception as e:
+                # Keep serving the previous snapshot
+                self.last_error = f"Error loading {os.path.basename(path)}: {e}"
+                return False
+            self.snapshot = snapshot  # atomic swap
+            self.last_error = ""
+            return True
+
+    def start(self, wait=False):
+        """
+        Loads the first snapshot and then watches for new exports, all on a
+        background thread. With `wait`, blocks until the first load finished.
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._watch, name="catalog-watcher", daemon=True)
+            self._thread.start()
+        if wait:
+            self.wait_ready()
+        return self
+
+    def wait_ready(self, timeout=None):
+        """Blocks until the first load attempt finished (returns immediately afterwards)."""
+        return self._ready.wait(timeout)
+
+    def _watch(self):
+        try:
+            self.reload_if_changed()
+        finally:
+            self._ready.set()
+        while True:
+            time.sleep(self.poll_seconds)
+            self.reload_if_changed()
@@ -0,0 +1,61 @@
+"""
+Duplicate-submission detection for variance.py.
+
+An Items entry is considered a duplicate of another when it shares the
+outlet, barcode, form type, expiry and submission day. Keys are normalised
+tuples so membership checks against the session list and against the recent
+rows already in the sheet are plain set / dict lookups.
+"""
+import sys
+
+from expiry_index import parse_expiry
+
+
+def duplicate_key(outlet, barcode, form_type, expiry, day):
+    """Normalised (outlet, barcode, form type, expiry, day) key."""
+    expiry_date = parse_expiry(expiry)
+    # Outlet, form type, expiry and day repeat across most keys; interning
+    # makes every key share one copy of each instead of holding its own.
+    return (
+        sys.intern(str(outlet or "").strip().lower()),
+        str(barcode or "").strip(),
+        sys.intern(str(form_type or "").strip().lower()),
+        sys.intern(expiry_date.isoformat() if expiry_date else ""),
+        sys.intern(str(day or "").strip()[:10]),
+    )
+
+
+def item_key(item):
+    """Key for an Items row / session item dict (day taken from "Date Submitted")."""
+    return duplicate_key(
+        item.get("Outlet"),
+        item.get("Barcode"),
+        item.get("Form Type"),
+        item.get("Expiry"),
+        item.get("Date Submitted"),
+    )
+
+
+def keys_from_records(records):
+    """Key set for Items rows as dicts, e.g. today's rows from `LocalMirror.records_on_day`."""
+    return frozenset(item_key(record) for record in records)
+
+
+def prices_match(existing, new):
+    """True when both entries carry the same Cost and Selling price (merging is only safe then)."""
+    return all(round(float(existing[col]), 2) == round(float(new[col]), 2) for col in ("Cost", "Selling"))
+
+
+def merge_item(existing, new):
+    """
+    Folds `new` into `existing` in place, summing Qty and recomputing Amount
+    and GP%. Callers check `prices_match` first; prices of `existing` are kept.
+    """
+    existing["Qty"] = existing["Qty"] + new["Qty"]
+    existing["Amount"] = round(existing["Cost"] * existing["Qty"], 2)
+    cost = float(existing["Cost"])
+    existing["GP%"] = round((float(existing["Selling"]) - cost) / cost * 100, 2) if cost else 0
+    if new.get("Remarks") and new["Remarks"] not in existing.get("Remarks", ""):
+        existing["Remarks"] = "; ".join(r for r in (existing.get("Remarks"), new["Remarks"]) if r)
+    return existing
+
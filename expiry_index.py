@@ -0,0 +1,214 @@
+"""
+Sorted expiry index over the "Items" worksheet.
+
+Rows captured with the "Expiry" / "Near Expiry" form types are grouped per
+outlet and kept sorted by expiry date, so "what expires in the next N days"
+is two binary searches instead of a full scan of the sheet.
+
+The same index drives the near-expiry alert panel in managers.py and the
+offline daily digest:
+
+    python expiry_index.py --source items.csv --days 7 --output digest.txt
+    python expiry_index.py --credentials service_account.json --days 7
+"""
+import argparse
+import bisect
+from datetime import date, datetime, timedelta
+
+EXPIRY_FORM_TYPES = ("Expiry", "Near Expiry")
+
+# variance.py writes "%d-%b-%y" (e.g. 31-Oct-25); the others cover manual edits
+# and exports that went through a spreadsheet round trip.
+EXPIRY_FORMATS = ("%d-%b-%y", "%Y-%m-%d", "%d-%b-%Y", "%d/%m/%Y", "%Y-%m-%d %H:%M:%S")
+
+DIGEST_COLUMNS = ["Expiry", "Days Left", "Outlet", "Form Type", "Barcode", "Item Name", "Qty", "Supplier"]
+
+
+def parse_expiry(value):
+    """Returns the expiry as a date, or None when it is empty or unparseable."""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = str(value or "").strip()
+    if not text:
+        return None
+    for fmt in EXPIRY_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+class ExpiryIndex:
+    """Per-outlet arrays of Items rows sorted by expiry date."""
+
+    def __init__(self):
+        # outlet (lower-cased) -> (sorted expiry ordinals, rows in the same order)
+        self._keys = {}
+        self._rows = {}
+        self._outlet_names = {}
+
+    @classmethod
+    def from_records(cls, records):
+        """Builds the index from `get_all_records()`-style dicts."""
+        index = cls()
+        staged = {}
+        for record in records:
+            if record.get("Form Type") not in EXPIRY_FORM_TYPES:
+                continue
+            expiry = parse_expiry(record.get("Expiry"))
+            outlet = str(record.get("Outlet", "")).strip()
+            if expiry is None or not outlet:
+                continue
+            key = outlet.lower()
+            index._outlet_names.setdefault(key, outlet)
+            staged.setdefault(key, []).append((expiry.toordinal(), record))
+
+        for key, entries in staged.items():
+            entries.sort(key=lambda entry: entry[0])
+            index._keys[key] = [entry[0] for entry in entries]
+            index._rows[key] = [entry[1] for entry in entries]
+        return index
+
+    def __len__(self):
+        return sum(len(keys) for keys in self._keys.values())
+
+    def outlets(self):
+        return sorted(self._outlet_names.values())
+
+    def expiring_within(self, days, outlet=None, today=None):
+        """
+        Returns (expiry date, row) pairs expiring between today and today + days
+        (both inclusive), ordered by expiry. `outlet=None` covers every outlet.
+        """
+        today = today or datetime.now().date()
+        low = today.toordinal()
+        high = (today + timedelta(days=days)).toordinal()
+
+        if outlet is None:
+            keys = list(self._keys)
+        else:
+            keys = [outlet.strip().lower()]
+
+        matches = []
+        for key in keys:
+            ordinals = self._keys.get(key)
+            if not ordinals:
+                continue
+            start = bisect.bisect_left(ordinals, low)
+            end = bisect.bisect_right(ordinals, high)
+            rows = self._rows[key]
+            matches.extend((date.fromordinal(ordinals[i]), rows[i]) for i in range(start, end))
+
+        if outlet is None:
+            matches.sort(key=lambda match: match[0])
+        return matches
+
+    def digest_rows(self, days, outlet=None, today=None):
+        """Flattens `expiring_within` into display rows (see DIGEST_COLUMNS)."""
+        today = today or datetime.now().date()
+        return [
+            {
+                "Expiry": expiry,
+                "Days Left": (expiry - today).days,
+                "Outlet": row.get("Outlet", ""),
+                "Form Type": row.get("Form Type", ""),
+                "Barcode": row.get("Barcode", ""),
+                "Item Name": row.get("Item Name", ""),
+                "Qty": row.get("Qty", ""),
+                "Supplier": row.get("Supplier", ""),
+            }
+            for expiry, row in self.expiring_within(days, outlet=outlet, today=today)
+        ]
+
+
+def build_expiry_index(records):
+    return ExpiryIndex.from_records(records)
+
+
+def build_expiry_index_from_table(table):
+    """Same index from an Arrow table of Items rows (e.g. the shared snapshot); only expiry rows leave Arrow."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    if "Form Type" not in table.column_names:
+        return ExpiryIndex()
+    expiry_rows = table.filter(pc.is_in(table["Form Type"], value_set=pa.array(EXPIRY_FORM_TYPES)))
+    return ExpiryIndex.from_records(expiry_rows.to_pylist())
+
+
+# ================================
+# OFFLINE DAILY DIGEST
+# ================================
+def render_digest(index, days, outlet=None, today=None):
+    """Plain-text digest of items expiring within `days`, grouped by outlet."""
+    today = today or datetime.now().date()
+    rows = index.digest_rows(days, outlet=outlet, today=today)
+    lines = [f"Near-expiry digest for {today:%d-%b-%Y} (next {days} days): {len(rows)} item(s)", ""]
+    if not rows:
+        lines.append("Nothing expires in this window.")
+        return "\n".join(lines) + "\n"
+
+    by_outlet = {}
+    for row in rows:
+        by_outlet.setdefault(row["Outlet"], []).append(row)
+    for outlet_name in sorted(by_outlet):
+        lines.append(f"== {outlet_name} ==")
+        for row in by_outlet[outlet_name]:
+            lines.append(
+                f"  {row['Expiry']:%d-%b-%y} ({row['Days Left']}d)  {row['Barcode']}  "
+                f"{row['Item Name']}  x{row['Qty']}  [{row['Supplier']}]"
+            )
+        lines.append("")
+    return "\n".join(lines)
+
+
+def load_records_from_file(path):
+    """Reads an Items export (.csv or .xlsx) as a list of dicts."""
+    import pandas as pd
+
+    if str(path).lower().endswith((".xlsx", ".xls")):
+        df = pd.read_excel(path, dtype=str)
+    else:
+        df = pd.read_csv(path, dtype=str)
+    df.columns = df.columns.str.strip()
+    return df.fillna("").to_dict("records")
+
+
+def load_records_from_sheet(credentials_file, sheet_url, sheet_name="Items"):
+    """Reads the live Items worksheet with a service-account JSON file."""
+    import gspread
+
+    client = gspread.service_account(filename=credentials_file)
+    return client.open_by_url(sheet_url).worksheet(sheet_name).get_all_records()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate the near-expiry daily digest.")
+    parser.add_argument("--source", help="Items export (.csv/.xlsx) to read instead of Google Sheets")
+    parser.add_argument("--credentials", help="Service-account JSON used to read the live sheet")
+    parser.add_argument("--sheet-url", default="https://docs.google.com/spreadsheets/d/1MK5WDETIFCRes-c8X16JjrNdrlEpHwv9vHvb96VVtM0/edit#gid=0")
+    parser.add_argument("--days", type=int, default=7, help="Alert window in days (default: 7)")
+    parser.add_argument("--outlet", help="Limit the digest to one outlet")
+    parser.add_argument("--output", help="Write the digest to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    if args.source:
+        records = load_records_from_file(args.source)
+    elif args.credentials:
+        records = load_records_from_sheet(args.credentials, args.sheet_url)
+    else:
+        parser.error("either --source or --credentials is required")
+
+    digest = render_digest(build_expiry_index(records), args.days, outlet=args.outlet)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            fh.write(digest)
+    else:
+        print(digest, end="")
+
+
+if __name__ == "__main__":
+    main()
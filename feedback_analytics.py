@@ -0,0 +1,283 @@
+"""
+Running customer-feedback statistics kept inside the local mirror.
+
+SQLite triggers on the mirror's `rows` table maintain, per outlet and day,
+the entry count, rating sum and a 1-5 rating histogram (`feedback_daily`),
+plus a small table of low-rated entries (`feedback_low`). Every way a
+Feedback row changes updates them in the same transaction:
+
+* a local submit from variance.py;
+* a row pulled by the replicator;
+* a remote edit;
+* a row removed from the sheet.
+
+Reports therefore read at most one row per outlet and day and never rescan
+the Feedback worksheet. The triggers are installed the first time
+`FeedbackAnalytics` opens a mirror, which also backfills the counters once
+from the rows already there.
+
+The managers.py feedback panel uses this, and so does the command line:
+
+    python feedback_analytics.py --days 7 30
+"""
+import argparse
+import os
+from datetime import date, timedelta
+
+from local_mirror import MIRROR_PATH, LocalMirror
+
+FEEDBACK_SHEET = "Feedback"
+
+# Entries rated at or below LOW_RATING are listed individually as alerts;
+# an outlet whose rolling 7-day average drops below ALERT_AVERAGE is flagged.
+LOW_RATING = 2
+ALERT_AVERAGE = float(os.environ.get("FEEDBACK_ALERT_AVERAGE", "3.5"))
+ALERT_MIN_ENTRIES = int(os.environ.get("FEEDBACK_ALERT_MIN_ENTRIES", "3"))
+
+# Column expressions over a mirror row (`{ref}` is NEW or OLD inside a trigger)
+_OUTLET = "TRIM(COALESCE(json_extract({ref}.data, '$.Outlet'), ''))"
+_DAY = "substr(TRIM(COALESCE(json_extract({ref}.data, '$.\"Submitted At\"'), '')), 1, 10)"
+_RATING = "CAST(json_extract({ref}.data, '$.Rating') AS INTEGER)"
+
+
+def _apply_sql(ref, sign):
+    """Statements adding (sign '+') or removing (sign '-') row `ref` from the counters."""
+    outlet, day, rating = _OUTLET.format(ref=ref), _DAY.format(ref=ref), _RATING.format(ref=ref)
+    histogram = ", ".join(f"r{r} = r{r} {sign} ({rating} = {r})" for r in range(1, 6))
+    statements = [
+        f"INSERT INTO feedback_daily (outlet, day) VALUES ({outlet}, {day}) ON CONFLICT DO NOTHING;",
+        f"UPDATE feedback_daily SET entries = entries {sign} 1, "
+        f"rated = rated {sign} ({rating} BETWEEN 1 AND 5), "
+        f"rating_sum = rating_sum {sign} (CASE WHEN {rating} BETWEEN 1 AND 5 THEN {rating} ELSE 0 END), "
+        f"{histogram} WHERE outlet = {outlet} AND day = {day};",
+    ]
+    if sign == "+":
+        statements.append(
+            f"INSERT OR REPLACE INTO feedback_low (row_key, outlet, day, submitted_at, rating, customer, mobile, feedback) "
+            f"SELECT {ref}.row_key, {outlet}, {day}, json_extract({ref}.data, '$.\"Submitted At\"'), {rating}, "
+            f"json_extract({ref}.data, '$.\"Customer Name\"'), json_extract({ref}.data, '$.\"Mobile Number\"'), "
+            f"json_extract({ref}.data, '$.Feedback') WHERE {rating} BETWEEN 1 AND {LOW_RATING};"
+        )
+    else:
+        statements.append(f"DELETE FROM feedback_low WHERE row_key = {ref}.row_key;")
+    return "\n    ".join(statements)
+
+
+SCHEMA = [
+    """
+    CREATE TABLE feedback_daily (
+        outlet TEXT NOT NULL,
+        day TEXT NOT NULL,                      -- YYYY-MM-DD of "Submitted At"
+        entries INTEGER NOT NULL DEFAULT 0,
+        rated INTEGER NOT NULL DEFAULT 0,       -- entries with a 1-5 rating
+        rating_sum INTEGER NOT NULL DEFAULT 0,
+        r1 INTEGER NOT NULL DEFAULT 0,
+        r2 INTEGER NOT NULL DEFAULT 0,
+        r3 INTEGER NOT NULL DEFAULT 0,
+        r4 INTEGER NOT NULL DEFAULT 0,
+        r5 INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (outlet, day)
+    )
+    """,
+    "CREATE INDEX feedback_daily_day ON feedback_daily (day)",
+    """
+    CREATE TABLE feedback_low (
+        row_key TEXT PRIMARY KEY,
+        outlet TEXT NOT NULL,
+        day TEXT NOT NULL,
+        submitted_at TEXT,
+        rating INTEGER NOT NULL,
+        customer TEXT,
+        mobile TEXT,
+        feedback TEXT
+    )
+    """,
+    "CREATE INDEX feedback_low_day ON feedback_low (day)",
+    f"""
+    CREATE TRIGGER feedback_row_insert AFTER INSERT ON rows WHEN NEW.sheet = '{FEEDBACK_SHEET}' BEGIN
+    {_apply_sql("NEW", "+")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER feedback_row_delete AFTER DELETE ON rows WHEN OLD.sheet = '{FEEDBACK_SHEET}' BEGIN
+    {_apply_sql("OLD", "-")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER feedback_row_update AFTER UPDATE OF data ON rows
+    WHEN NEW.sheet = '{FEEDBACK_SHEET}' AND OLD.data IS NOT NEW.data BEGIN
+    {_apply_sql("OLD", "-")}
+    {_apply_sql("NEW", "+")}
+    END
+    """,
+]
+
+# One-off aggregation of the rows already in the mirror, run with the install
+_ROW_OUTLET, _ROW_DAY, _ROW_RATING = (expr.format(ref="rows") for expr in (_OUTLET, _DAY, _RATING))
+BACKFILL = [
+    f"""
+    INSERT INTO feedback_daily (outlet, day, entries, rated, rating_sum, r1, r2, r3, r4, r5)
+    SELECT outlet, day, COUNT(*), SUM(rating BETWEEN 1 AND 5),
+           SUM(CASE WHEN rating BETWEEN 1 AND 5 THEN rating ELSE 0 END),
+           SUM(rating = 1), SUM(rating = 2), SUM(rating = 3), SUM(rating = 4), SUM(rating = 5)
+    FROM (SELECT {_ROW_OUTLET} AS outlet, {_ROW_DAY} AS day, {_ROW_RATING} AS rating
+          FROM rows WHERE sheet = '{FEEDBACK_SHEET}')
+    GROUP BY outlet, day
+    """,
+    f"""
+    INSERT OR REPLACE INTO feedback_low (row_key, outlet, day, submitted_at, rating, customer, mobile, feedback)
+    SELECT row_key, {_ROW_OUTLET}, {_ROW_DAY}, json_extract(data, '$."Submitted At"'), {_ROW_RATING},
+           json_extract(data, '$."Customer Name"'), json_extract(data, '$."Mobile Number"'),
+           json_extract(data, '$.Feedback')
+    FROM rows WHERE sheet = '{FEEDBACK_SHEET}' AND {_ROW_RATING} BETWEEN 1 AND {LOW_RATING}
+    """,
+]
+
+
+def _parse_day(day):
+    try:
+        return date.fromisoformat(day)
+    except (TypeError, ValueError):
+        return None
+
+
+def _average(rating_sum, rated):
+    return round(rating_sum / rated, 2) if rated else None
+
+
+class FeedbackAnalytics:
+    """Read side of the feedback counters; installs them on `mirror` if needed."""
+
+    def __init__(self, mirror):
+        self.mirror = mirror
+        self.install()
+
+    def install(self):
+        """Creates the tables and triggers and backfills them, once per mirror file."""
+        if self.mirror.query("SELECT 1 FROM sqlite_master WHERE name = 'feedback_row_update'"):
+            return False
+        with self.mirror.transaction() as conn:
+            # Another process may have installed them while we waited for the lock
+            if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'feedback_row_update'").fetchone():
+                return False
+            conn.execute("DROP TABLE IF EXISTS feedback_daily")
+            conn.execute("DROP TABLE IF EXISTS feedback_low")
+            for statement in SCHEMA:
+                conn.execute(statement)
+            for statement in BACKFILL:
+                conn.execute(statement)
+        return True
+
+    def _daily(self, since, outlet=None):
+        sql = "SELECT outlet, day, entries, rated, rating_sum, r1, r2, r3, r4, r5 FROM feedback_daily WHERE day >= ?"
+        params = [since.isoformat()]
+        if outlet:
+            sql += " AND lower(outlet) = lower(?)"
+            params.append(outlet)
+        return self.mirror.query(sql + " ORDER BY day", params)
+
+    def rolling(self, windows=(7, 30), outlet=None, today=None):
+        """
+        Per outlet: entries, average rating and histogram over each trailing
+        window of days ending `today`, e.g.
+        {"Hilal": {7: {"entries": 4, "average": 4.5, "histogram": [0, 0, 1, 0, 3]}, 30: {...}}}
+        """
+        today = today or date.today()
+        stats = {}
+        for row in self._daily(today - timedelta(days=max(windows) - 1), outlet):
+            name, day, entries, rated, rating_sum, histogram = row[0], row[1], row[2], row[3], row[4], row[5:]
+            parsed = _parse_day(day)
+            age = (today - parsed).days if parsed else None
+            for window in windows:
+                if age is None or not 0 <= age < window:
+                    continue
+                bucket = stats.setdefault(name, {}).setdefault(
+                    window, {"entries": 0, "rated": 0, "rating_sum": 0, "histogram": [0] * 5}
+                )
+                bucket["entries"] += entries
+                bucket["rated"] += rated
+                bucket["rating_sum"] += rating_sum
+                bucket["histogram"] = [a + b for a, b in zip(bucket["histogram"], histogram)]
+        for windows_stats in stats.values():
+            for bucket in windows_stats.values():
+                bucket["average"] = _average(bucket.pop("rating_sum"), bucket.pop("rated"))
+        return stats
+
+    def trend(self, days=30, window=7, outlet=None, today=None):
+        """[(day, rolling `window`-day average)] for each of the last `days` days (None without ratings)."""
+        today = today or date.today()
+        first = today - timedelta(days=days - 1)
+        totals = {}
+        for row in self._daily(first - timedelta(days=window - 1), outlet):
+            rated, rating_sum = totals.get(row[1], (0, 0))
+            totals[row[1]] = (rated + row[3], rating_sum + row[4])
+        series = []
+        for offset in range(days):
+            day = first + timedelta(days=offset)
+            span = [totals.get((day - timedelta(days=i)).isoformat(), (0, 0)) for i in range(window)]
+            series.append((day, _average(sum(s for _, s in span), sum(r for r, _ in span))))
+        return series
+
+    def low_ratings(self, days=7, outlet=None, today=None):
+        """Entries rated LOW_RATING or less within the last `days` days, newest first."""
+        today = today or date.today()
+        sql = ("SELECT submitted_at, outlet, rating, customer, mobile, feedback FROM feedback_low "
+               "WHERE day BETWEEN ? AND ?")
+        params = [(today - timedelta(days=days - 1)).isoformat(), today.isoformat()]
+        if outlet:
+            sql += " AND lower(outlet) = lower(?)"
+            params.append(outlet)
+        columns = ["Submitted At", "Outlet", "Rating", "Customer Name", "Mobile Number", "Feedback"]
+        return [dict(zip(columns, row)) for row in self.mirror.query(sql + " ORDER BY submitted_at DESC", params)]
+
+    def alerts(self, outlet=None, today=None):
+        """Outlets whose rolling 7-day average is below ALERT_AVERAGE (with enough entries to count)."""
+        flagged = []
+        for name, windows in sorted(self.rolling((7,), outlet, today).items()):
+            week = windows.get(7)
+            if week and week["average"] is not None and week["entries"] >= ALERT_MIN_ENTRIES \
+                    and week["average"] < ALERT_AVERAGE:
+                flagged.append((name, week["average"], week["entries"]))
+        return flagged
+
+
+def summary_rows(stats, windows=(7, 30)):
+    """Flattens `FeedbackAnalytics.rolling` output into one table row per outlet."""
+    rows = []
+    for name in sorted(stats):
+        row = {"Outlet": name}
+        for window in windows:
+            bucket = stats[name].get(window, {"entries": 0, "average": None})
+            row[f"{window}d Avg"] = bucket["average"]
+            row[f"{window}d Entries"] = bucket["entries"]
+        longest = stats[name].get(max(windows))
+        for rating in range(1, 6):
+            row[f"{rating}★"] = longest["histogram"][rating - 1] if longest else 0
+        rows.append(row)
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rolling customer-feedback ratings per outlet from the local mirror.")
+    parser.add_argument("--mirror", default=MIRROR_PATH, help="Local mirror SQLite file")
+    parser.add_argument("--days", type=int, nargs="+", default=[7, 30], help="Rolling windows in days")
+    parser.add_argument("--outlet", help="Only this outlet")
+    args = parser.parse_args(argv)
+
+    analytics = FeedbackAnalytics(LocalMirror(args.mirror))
+    rows = summary_rows(analytics.rolling(tuple(args.days), args.outlet), tuple(args.days))
+    if not rows:
+        print("No feedback in the mirror for the selected period.")
+        return
+    columns = list(rows[0])
+    print(" | ".join(columns))
+    for row in rows:
+        print(" | ".join("-" if row[col] is None else str(row[col]) for col in columns))
+    for name, average, entries in analytics.alerts(args.outlet):
+        print(f"! {name}: 7-day average {average} over {entries} entries")
+    for entry in analytics.low_ratings(7, args.outlet):
+        print(f"! {entry['Submitted At']} {entry['Outlet']} rated {entry['Rating']}: {entry['Feedback']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""
+Monthly Parquet archive for the "Items" worksheet.
+
+Rows submitted before a cutoff date are moved out of the live sheet into a
+hive-partitioned Parquet dataset. Expiry / Near Expiry rows whose expiry is
+today or later stay live, so the expiry alerts and digest (which only read
+the live sheet) keep seeing them until they have expired:
+
+    archive/items/month=2025-10/outlet=hilal/part-<run>-0.parquet
+
+and the sheet is trimmed, so the dashboard's everyday `get_all_records()` only
+pulls recent history. Date-range queries over older data read just the
+partitions they need (month / outlet pruning) and push the date predicate down
+to the Parquet row groups.
+
+Deleting sheet rows shifts the row numbers the apps' replicator pushes edits
+to, so the job takes the local mirror's replication lease while it trims.
+
+Run the job from cron, e.g. keep the last 60 days live:
+
+    python items_archive.py --credentials service_account.json --keep-days 60
+"""
+import argparse
+import json
+import os
+import uuid
+from datetime import date, datetime, timedelta
+
+from expiry_index import EXPIRY_FORM_TYPES, parse_expiry
+from local_mirror import MIRROR_PATH, LocalMirror
+
+ARCHIVE_DIR = os.environ.get("ITEMS_ARCHIVE_DIR", os.path.join("archive", "items"))
+MANIFEST_NAME = "_manifest.json"
+LEASE_WAIT_SECONDS = 300   # how long to wait for a running sync pass to finish
+LEASE_HOLD_SECONDS = 1800  # lease lifetime while trimming; released as soon as the job is done
+
+# Derived columns stored next to the sheet values (all sheet values stay strings)
+PARTITION_COLS = ["month", "outlet"]
+DATE_COLS = ["Submitted Date", "Expiry Date"]
+DERIVED_COLS = PARTITION_COLS + DATE_COLS
+
+
+def archive_schema(headers):
+    """
+    Fixed Arrow schema for the dataset: sheet columns as strings, derived dates
+    as date32, partition columns as strings. Every run writes (and every read
+    uses) this schema, so a run whose dates are all empty can't pin a column to
+    the `null` type.
+    """
+    import pyarrow as pa
+
+    fields = [pa.field(col, pa.string()) for col in headers if col not in DERIVED_COLS]
+    fields += [pa.field(col, pa.date32()) for col in DATE_COLS]
+    fields += [pa.field(col, pa.string()) for col in PARTITION_COLS]
+    return pa.schema(fields)
+
+
+# ================================
+# MANIFEST
+# ================================
+def read_manifest(root=ARCHIVE_DIR):
+    try:
+        with open(os.path.join(root, MANIFEST_NAME), encoding="utf-8") as fh:
+            return json.load(fh)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def archived_before(root=ARCHIVE_DIR):
+    """Cutoff date of the latest archive run; rows before it live only in Parquet."""
+    value = read_manifest(root).get("archived_before")
+    return datetime.strptime(value, "%Y-%m-%d").date() if value else None
+
+
+def _write_manifest(root, manifest):
+    path = os.path.join(root, MANIFEST_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh, indent=2)
+    os.replace(tmp_path, path)
+
+
+# ================================
+# ARCHIVE JOB
+# ================================
+def _to_table(headers, rows):
+    import pandas as pd
+    import pyarrow as pa
+
+    df = pd.DataFrame(rows, columns=headers).astype(str)
+    submitted = pd.to_datetime(df["Date Submitted"], errors="coerce")
+    df["Submitted Date"] = [None if pd.isna(value) else value.date() for value in submitted]
+    df["Expiry Date"] = [parse_expiry(value) for value in df.get("Expiry", [""] * len(df))]
+    df["month"] = submitted.dt.strftime("%Y-%m").fillna("unknown")
+    df["outlet"] = df["Outlet"].str.strip().str.lower() if "Outlet" in df.columns else "unknown"
+    return pa.Table.from_pandas(df, schema=archive_schema(headers), preserve_index=False)
+
+
+def _contiguous_runs(row_numbers):
+    """Groups sorted 1-based sheet row numbers into (start, end) runs."""
+    runs = []
+    for row_number in row_numbers:
+        if runs and runs[-1][1] == row_number - 1:
+            runs[-1][1] = row_number
+        else:
+            runs.append([row_number, row_number])
+    return [tuple(run) for run in runs]
+
+
+def archive_items(worksheet, cutoff_date, root=ARCHIVE_DIR, dry_run=False, today=None, mirror=None):
+    """
+    Moves rows with "Date Submitted" before `cutoff_date` from `worksheet` into
+    the Parquet archive under `root`, then deletes them from the sheet.
+    Expiry rows that have not expired by `today` are kept live.
+    With `mirror` (the apps' LocalMirror), the job holds its replication
+    lease from reading the sheet until the rows are deleted, so no sync pass
+    pushes edits to row numbers the deletes shift.
+    Returns the number of archived rows.
+    """
+    if mirror is None or dry_run:
+        return _archive(worksheet, cutoff_date, root, dry_run, today)
+    with mirror.hold_lease(f"items-archive-{os.getpid()}", timeout=LEASE_WAIT_SECONDS, seconds=LEASE_HOLD_SECONDS):
+        return _archive(worksheet, cutoff_date, root, dry_run, today)
+
+
+def _archive(worksheet, cutoff_date, root, dry_run, today):
+    import pyarrow.parquet as pq
+
+    all_values = worksheet.get_all_values()
+    if len(all_values) < 2:
+        return 0
+    headers = all_values[0]
+    date_idx = headers.index("Date Submitted")
+    form_idx = headers.index("Form Type") if "Form Type" in headers else None
+    expiry_idx = headers.index("Expiry") if "Expiry" in headers else None
+    cutoff = cutoff_date.strftime("%Y-%m-%d")
+    today = today or date.today()
+
+    old_rows, old_row_numbers = [], []
+    for row_number, values in enumerate(all_values[1:], start=2):
+        values = (values + [""] * len(headers))[:len(headers)]
+        submitted = values[date_idx][:10]
+        # Unparseable dates stay in the live sheet for someone to fix
+        if not (submitted and submitted[:4].isdigit() and submitted < cutoff):
+            continue
+        # Still due to show up in the near-expiry alerts
+        if form_idx is not None and expiry_idx is not None and values[form_idx] in EXPIRY_FORM_TYPES:
+            expiry = parse_expiry(values[expiry_idx])
+            if expiry is not None and expiry >= today:
+                continue
+        old_rows.append(values)
+        old_row_numbers.append(row_number)
+
+    if not old_rows or dry_run:
+        return len(old_rows)
+
+    os.makedirs(root, exist_ok=True)
+    run_id = f"{datetime.now():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}"  # unique even for runs within a second
+    pq.write_to_dataset(
+        _to_table(headers, old_rows),
+        root_path=root,
+        partition_cols=PARTITION_COLS,
+        basename_template=f"part-{run_id}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+    )
+
+    # Only trim the sheet once the Parquet files are on disk; delete bottom-up
+    # so earlier row numbers stay valid.
+    for start, end in reversed(_contiguous_runs(old_row_numbers)):
+        worksheet.delete_rows(start, end)
+
+    manifest = read_manifest(root)
+    previous = manifest.get("archived_before")
+    manifest["archived_before"] = max(previous, cutoff) if previous else cutoff
+    # Union of the sheet headers over all runs, so reads survive a header change
+    columns = manifest.get("columns", [])
+    manifest["columns"] = columns + [col for col in headers if col not in columns]
+    manifest["last_run"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    manifest["rows_archived"] = manifest.get("rows_archived", 0) + len(old_rows)
+    _write_manifest(root, manifest)
+    return len(old_rows)
+
+
+# ================================
+# HISTORICAL QUERIES
+# ================================
+def read_archive(start_date, end_date, date_column="Date Submitted", outlet=None, form_type=None, root=ARCHIVE_DIR):
+    """
+    Reads archived rows between `start_date` and `end_date` (inclusive) on
+    `date_column` ("Date Submitted" or "Expiry"). Month and outlet filters prune
+    partitions; the date filter is pushed down to the Parquet row groups.
+    Returns a DataFrame shaped like the live sheet (derived columns dropped).
+    """
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    if not os.path.isdir(root) or archived_before(root) is None:
+        return pd.DataFrame()
+
+    if date_column == "Date Submitted":
+        expr = (ds.field("month") >= start_date.strftime("%Y-%m")) & (ds.field("month") <= end_date.strftime("%Y-%m"))
+        expr &= (ds.field("Submitted Date") >= start_date) & (ds.field("Submitted Date") <= end_date)
+    else:
+        expr = (ds.field("Expiry Date") >= start_date) & (ds.field("Expiry Date") <= end_date)
+    if outlet:
+        expr &= ds.field("outlet") == outlet.strip().lower()
+    if form_type:
+        expr &= ds.field("Form Type") == form_type
+
+    try:
+        columns = read_manifest(root).get("columns") or _file_columns(root)
+        schema = archive_schema(columns)
+        partitioning = ds.partitioning(pa.schema([schema.field(col) for col in PARTITION_COLS]), flavor="hive")
+        table = ds.dataset(root, schema=schema, format="parquet", partitioning=partitioning).to_table(filter=expr)
+    except (FileNotFoundError, ValueError, pa.ArrowException):
+        return pd.DataFrame()
+    return table.drop_columns(DERIVED_COLS).to_pandas().fillna("")
+
+
+def _file_columns(root):
+    """Sheet columns found in the Parquet files (archives written before the manifest listed them)."""
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+
+    columns = []
+    for path in ds.dataset(root, format="parquet", partitioning="hive").files:
+        columns += [col for col in pq.read_schema(path).names if col not in columns]
+    return columns
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Archive old Items rows to Parquet and trim the live sheet.")
+    parser.add_argument("--credentials", required=True, help="Service-account JSON used to open the sheet")
+    parser.add_argument("--sheet-url", default="https://docs.google.com/spreadsheets/d/1MK5WDETIFCRes-c8X16JjrNdrlEpHwv9vHvb96VVtM0/edit#gid=0")
+    parser.add_argument("--sheet-name", default="Items")
+    parser.add_argument("--keep-days", type=int, default=60, help="Days of history to keep in the live sheet (default: 60)")
+    parser.add_argument("--root", default=ARCHIVE_DIR, help=f"Archive directory (default: {ARCHIVE_DIR})")
+    parser.add_argument("--dry-run", action="store_true", help="Only count the rows that would be archived")
+    parser.add_argument("--mirror", default=MIRROR_PATH,
+                        help=f"Local mirror the apps replicate through; its sync is paused while rows are deleted (default: {MIRROR_PATH})")
+    args = parser.parse_args(argv)
+
+    import gspread
+
+    worksheet = gspread.service_account(filename=args.credentials).open_by_url(args.sheet_url).worksheet(args.sheet_name)
+    cutoff = datetime.now().date() - timedelta(days=args.keep_days)
+    # No mirror file means no app replicates on this host; nothing to pause
+    mirror = LocalMirror(args.mirror) if os.path.exists(args.mirror) else None
+    count = archive_items(worksheet, cutoff, root=args.root, dry_run=args.dry_run, mirror=mirror)
+    verb = "Would archive" if args.dry_run else "Archived"
+    print(f"{verb} {count} row(s) submitted before {cutoff:%Y-%m-%d} into {args.root}")
+
+
+if __name__ == "__main__":
+    main()
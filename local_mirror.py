@@ -0,0 +1,607 @@
+"""
+Offline-first local mirror of the Items / Feedback worksheets.
+
+Both apps read from and write to a SQLite file on the server instead of
+calling the Sheets API on every rerun. A background `Replicator` keeps the
+mirror and Google Sheets in step:
+
+* pull  - new remote rows are inserted locally, rows removed remotely (e.g. by
+          the archive job) are dropped, remote edits are applied;
+* push  - rows added locally are appended to the sheet, local edits to the
+          editable columns ("Action Took", "Action Took Date", "Supplier Name")
+          are written back with one batch update.
+
+Edits to the editable columns are merged three-way against the value seen at
+the last sync: a change on only one side wins; when both sides changed, the
+local edit wins and the overwritten remote value is logged in `conflicts`.
+
+Rows are identified by a hash of their immutable columns (plus an occurrence
+counter for exact repeats), since sheet row numbers shift when rows are
+deleted.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+MIRROR_PATH = os.environ.get("LOCAL_MIRROR_PATH", "local_mirror.sqlite3")
+SYNC_INTERVAL = int(os.environ.get("MIRROR_SYNC_INTERVAL", "30"))
+LEASE_SECONDS = 120
+REQUEST_POLL_SECONDS = 1.0  # how often the lease holder checks for sync requests from other workers
+
+SHEET_CONFIG = {
+    "Items": {
+        "identity": ("Date Submitted", "Outlet", "Barcode", "Form Type", "Expiry", "Item Name", "Staff Name"),
+        "editable": ("Action Took", "Action Took Date", "Supplier Name"),
+    },
+    "Feedback": {
+        "identity": ("Submitted At", "Outlet", "Customer Name", "Mobile Number"),
+        "editable": (),
+    },
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rows (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    sheet TEXT NOT NULL,
+    row_key TEXT NOT NULL,
+    data TEXT NOT NULL,     -- JSON object: header -> string value
+    base TEXT,              -- JSON of the editable values as of the last sync
+    payload TEXT,           -- JSON list of values still to be appended (NULL once on the sheet)
+    dirty INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (sheet, row_key)
+);
+CREATE TABLE IF NOT EXISTS headers (
+    sheet TEXT PRIMARY KEY,
+    headers TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS conflicts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    sheet TEXT NOT NULL,
+    row_key TEXT NOT NULL,
+    col TEXT NOT NULL,
+    local_value TEXT,
+    remote_value TEXT,
+    resolved_to TEXT,
+    at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+-- Serves `records_on_day` (today's Items rows for duplicate detection)
+CREATE INDEX IF NOT EXISTS rows_by_submitted ON rows (sheet, json_extract(data, '$."Date Submitted"'));
+"""
+
+
+def _now():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _identity_hash(sheet, record):
+    columns = SHEET_CONFIG.get(sheet, {}).get("identity") or sorted(record)
+    raw = "\x1f".join(str(record.get(col, "")).strip() for col in columns)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]
+
+
+def row_keys(sheet, records, existing=None):
+    """
+    Row keys for `records` in order. Exact repeats get an occurrence suffix;
+    `existing` (hash -> count already used) continues numbering for appends.
+    """
+    seen = dict(existing or {})
+    keys = []
+    for record in records:
+        digest = _identity_hash(sheet, record)
+        occurrence = seen.get(digest, 0)
+        seen[digest] = occurrence + 1
+        keys.append(f"{digest}:{occurrence}")
+    return keys
+
+
+class LocalMirror:
+    """SQLite-backed copy of the worksheets; safe to share between threads and processes."""
+
+    def __init__(self, path=MIRROR_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._conn().executescript(SCHEMA)
+
+    # ---------- connection helpers ----------
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    class _Transaction:
+        def __init__(self, conn):
+            self.conn = conn
+
+        def __enter__(self):
+            self.conn.execute("BEGIN IMMEDIATE")
+            return self.conn
+
+        def __exit__(self, exc_type, exc, tb):
+            self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+            return False
+
+    def transaction(self):
+        """
+        Write transaction (BEGIN IMMEDIATE) on this thread's connection, for
+        use as `with mirror.transaction() as conn:`; commits on success and
+        rolls back on error. Lets add-ons (e.g. feedback_analytics) keep their
+        own tables in the mirror file.
+        """
+        return self._Transaction(self._conn())
+
+    def query(self, sql, params=()):
+        """Runs a read-only statement on this thread's connection; returns all rows."""
+        return self._conn().execute(sql, params).fetchall()
+
+    def _get_state(self, key, conn=None):
+        row = (conn or self._conn()).execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_state(self, conn, key, value):
+        conn.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)", (key, value))
+
+    def _bump_version(self, conn):
+        conn.execute(
+            "INSERT INTO sync_state (key, value) VALUES ('version', '1') "
+            "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+        )
+
+    # ---------- reads ----------
+    def version(self):
+        """Counter bumped on every local write or pulled change (use as a cache key)."""
+        return int(self._get_state("version") or 0)
+
+    def headers(self, sheet):
+        row = self._conn().execute("SELECT headers FROM headers WHERE sheet = ?", (sheet,)).fetchone()
+        return json.loads(row[0]) if row else []
+
+    def records(self, sheet, with_keys=False):
+        """Rows as dicts (all values as strings), in sheet order; like `get_all_records()`."""
+        headers = self.headers(sheet)
+        result = []
+        for row_key, data in self._conn().execute(
+            "SELECT row_key, data FROM rows WHERE sheet = ? ORDER BY seq", (sheet,)
+        ):
+            data = json.loads(data)
+            record = {col: data.get(col, "") for col in headers} if headers else data
+            if with_keys:
+                record["_row_key"] = row_key
+            result.append(record)
+        return result
+
+    def records_on_day(self, sheet, day, column="Date Submitted"):
+        """
+        Rows whose `column` starts with `day` ("YYYY-MM-DD"), as dicts. Only
+        those rows are read and decoded; the range is served by an index.
+        """
+        path = '$."' + column.replace("'", "''") + '"'
+        next_day = (datetime.strptime(day, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+        return [
+            json.loads(data)
+            for (data,) in self._conn().execute(
+                f"SELECT data FROM rows WHERE sheet = ? AND json_extract(data, '{path}') >= ? "
+                f"AND json_extract(data, '{path}') < ? ORDER BY seq",
+                (sheet, day, next_day),
+            )
+        ]
+
+    def all_values(self, sheet):
+        """Header row plus value rows; like `get_all_values()`."""
+        records = self.records(sheet)
+        headers = self.headers(sheet) or (list(records[0]) if records else [])
+        if not headers:
+            return []
+        return [headers] + [[str(record.get(col, "")) for col in headers] for record in records]
+
+    def status(self):
+        conn = self._conn()
+        pending = conn.execute("SELECT COUNT(*) FROM rows WHERE payload IS NOT NULL").fetchone()[0]
+        dirty = conn.execute("SELECT COUNT(*) FROM rows WHERE dirty = 1").fetchone()[0]
+        return {
+            "last_sync": self._get_state("last_sync"),
+            "last_error": self._get_state("last_error") or "",
+            "pending_rows": pending,
+            "pending_edits": dirty,
+        }
+
+    def pending_count(self, sheet, row_keys):
+        """How many of `row_keys` are still waiting to be appended to `sheet`."""
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM rows WHERE sheet = ? AND payload IS NOT NULL "
+            "AND row_key IN (SELECT value FROM json_each(?))",
+            (sheet, json.dumps(list(row_keys))),
+        ).fetchone()[0]
+
+    def error_since(self, since):
+        """The last sync error if it was recorded after `since` (a `time.time()` value), else ""."""
+        if float(self._get_state("last_error_at") or 0) <= since:
+            return ""
+        return self._get_state("last_error") or ""
+
+    # ---------- local writes ----------
+    def append_rows(self, sheet, headers, rows):
+        """Queues `rows` (lists ordered like `headers`) for appending to `sheet`; returns their row keys."""
+        with self.transaction() as conn:
+            if not conn.execute("SELECT 1 FROM headers WHERE sheet = ?", (sheet,)).fetchone():
+                conn.execute("INSERT INTO headers (sheet, headers) VALUES (?, ?)", (sheet, json.dumps(list(headers))))
+            records = [dict(zip(headers, ["" if v is None else str(v) for v in row])) for row in rows]
+            existing = {}
+            for (row_key,) in conn.execute("SELECT row_key FROM rows WHERE sheet = ?", (sheet,)):
+                digest = row_key.split(":")[0]
+                existing[digest] = existing.get(digest, 0) + 1
+            keys = row_keys(sheet, records, existing)
+            for row_key, record, row in zip(keys, records, rows):
+                conn.execute(
+                    "INSERT INTO rows (sheet, row_key, data, payload) VALUES (?, ?, ?, ?)",
+                    (sheet, row_key, json.dumps(record), json.dumps(list(row), default=str)),
+                )
+            self._bump_version(conn)
+        return keys
+
+    def update_cells(self, sheet, updates):
+        """
+        Applies `updates` ({row_key: {column: value}}) to editable columns.
+        Returns the number of rows that actually changed.
+        """
+        editable = set(SHEET_CONFIG.get(sheet, {}).get("editable", ()))
+        changed = 0
+        with self.transaction() as conn:
+            for row_key, values in updates.items():
+                row = conn.execute(
+                    "SELECT data FROM rows WHERE sheet = ? AND row_key = ?", (sheet, row_key)
+                ).fetchone()
+                if row is None:
+                    continue
+                data = json.loads(row[0])
+                new_values = {col: "" if v is None else str(v) for col, v in values.items() if col in editable}
+                if all(data.get(col, "") == value for col, value in new_values.items()):
+                    continue
+                data.update(new_values)
+                conn.execute(
+                    "UPDATE rows SET data = ?, dirty = 1 WHERE sheet = ? AND row_key = ?",
+                    (json.dumps(data), sheet, row_key),
+                )
+                changed += 1
+            if changed:
+                self._bump_version(conn)
+        return changed
+
+    # ---------- replication ----------
+    def acquire_lease(self, owner, seconds=LEASE_SECONDS):
+        """
+        Only one replicator per mirror file (across processes) syncs at a time.
+        While someone else has a pending `hold_lease` claim, the holder lets go
+        of the lease at its next attempt and nobody else gets it.
+        """
+        now = time.time()
+        with self.transaction() as conn:
+            claim = self._get_state("lease_claim", conn)
+            if claim:
+                claimant, claim_expires = claim.rsplit("|", 1)
+                if claimant != owner and float(claim_expires) > now:
+                    lease = self._get_state("lease", conn)
+                    if lease and lease.rsplit("|", 1)[0] == owner:
+                        conn.execute("DELETE FROM sync_state WHERE key = 'lease'")
+                    return False
+            lease = self._get_state("lease", conn)
+            if lease:
+                holder, expires = lease.rsplit("|", 1)
+                if holder != owner and float(expires) > now:
+                    return False
+            self._set_state(conn, "lease", f"{owner}|{now + seconds}")
+            if claim and claimant == owner:
+                conn.execute("DELETE FROM sync_state WHERE key = 'lease_claim'")
+        return True
+
+    def release_lease(self, owner):
+        with self.transaction() as conn:
+            lease = self._get_state("lease", conn)
+            if lease and lease.rsplit("|", 1)[0] == owner:
+                conn.execute("DELETE FROM sync_state WHERE key = 'lease'")
+
+    @contextmanager
+    def hold_lease(self, owner, timeout=LEASE_SECONDS, seconds=LEASE_SECONDS):
+        """
+        Takes the lease ahead of the replicators for a job that changes sheet
+        rows (e.g. the archive job deleting rows, which shifts the row numbers a
+        pass pushes edits to). Waits up to `timeout` seconds for the current
+        holder to finish its pass; raises TimeoutError if it doesn't.
+        """
+        deadline = time.time() + timeout
+        with self.transaction() as conn:
+            self._set_state(conn, "lease_claim", f"{owner}|{deadline}")
+        try:
+            while not self.acquire_lease(owner, seconds):
+                if time.time() >= deadline:
+                    raise TimeoutError(f"Mirror lease still held after {timeout}s; is a sync pass stuck?")
+                self.request_sync()  # wakes the holder so it lets go sooner
+                time.sleep(REQUEST_POLL_SECONDS)
+            yield
+        finally:
+            with self.transaction() as conn:
+                claim = self._get_state("lease_claim", conn)
+                if claim and claim.rsplit("|", 1)[0] == owner:
+                    conn.execute("DELETE FROM sync_state WHERE key = 'lease_claim'")
+            self.release_lease(owner)
+            self.request_sync()  # pull the result right away
+
+    def request_sync(self):
+        """Asks the lease holder, in whichever process it runs, for a pass now."""
+        with self.transaction() as conn:
+            self._set_state(conn, "sync_requested", repr(time.time()))
+
+    def sync_requested_since(self, since):
+        return float(self._get_state("sync_requested") or 0) > since
+
+    def record_error(self, error):
+        with self.transaction() as conn:
+            self._set_state(conn, "last_error", f"{_now()}: {error}")
+            self._set_state(conn, "last_error_at", repr(time.time()))
+
+    def replicate(self, worksheets):
+        """One two-way sync pass over {sheet name: gspread worksheet}."""
+        for sheet, worksheet in worksheets.items():
+            self._replicate_sheet(sheet, worksheet)
+        with self.transaction() as conn:
+            self._set_state(conn, "last_sync", _now())
+            self._set_state(conn, "last_error", "")
+
+    def _replicate_sheet(self, sheet, worksheet):
+        import gspread
+
+        remote = worksheet.get_all_values()
+        remote_headers = remote[0] if remote else []
+        width = len(remote_headers)
+        remote_records = [dict(zip(remote_headers, (values + [""] * width)[:width])) for values in remote[1:]]
+        remote_index = {
+            key: (row_number, record)
+            for row_number, (key, record) in enumerate(
+                zip(row_keys(sheet, remote_records), remote_records), start=2
+            )
+        }
+        editable = [col for col in SHEET_CONFIG.get(sheet, {}).get("editable", ()) if col in remote_headers]
+
+        push_cells = []       # gspread batch_update entries
+        pushed_rows = {}      # row_key -> data after the push succeeds
+        with self.transaction() as conn:
+            if remote_headers:
+                conn.execute(
+                    "INSERT OR REPLACE INTO headers (sheet, headers) VALUES (?, ?)", (sheet, json.dumps(remote_headers))
+                )
+            local = {
+                row_key: (json.loads(data), json.loads(base) if base else None, payload, dirty)
+                for row_key, data, base, payload, dirty in conn.execute(
+                    "SELECT row_key, data, base, payload, dirty FROM rows WHERE sheet = ?", (sheet,)
+                )
+            }
+            changed = False
+
+            for row_key, (row_number, record) in remote_index.items():
+                remote_base = json.dumps({col: record.get(col, "") for col in editable})
+                if row_key not in local:
+                    conn.execute(
+                        "INSERT INTO rows (sheet, row_key, data, base) VALUES (?, ?, ?, ?)",
+                        (sheet, row_key, json.dumps(record), remote_base),
+                    )
+                    changed = True
+                    continue
+
+                data, base, payload, dirty = local[row_key]
+                merged = dict(record)
+                local_wins = {}
+                if dirty:
+                    base = base or {}
+                    for col in editable:
+                        remote_value = record.get(col, "")
+                        local_value = data.get(col, "")
+                        base_value = base.get(col, remote_value)
+                        if local_value == remote_value or local_value == base_value:
+                            continue
+                        if remote_value != base_value:
+                            conn.execute(
+                                "INSERT INTO conflicts (sheet, row_key, col, local_value, remote_value, resolved_to, at) "
+                                "VALUES (?, ?, ?, ?, ?, 'local', ?)",
+                                (sheet, row_key, col, local_value, remote_value, _now()),
+                            )
+                        local_wins[col] = local_value
+
+                merged.update(local_wins)
+                for col, value in local_wins.items():
+                    push_cells.append({
+                        "range": gspread.utils.rowcol_to_a1(row_number, remote_headers.index(col) + 1),
+                        "values": [[value]],
+                    })
+                if local_wins:
+                    # Stays dirty (with the old base) until the batch update succeeds
+                    pushed_rows[row_key] = merged
+                    conn.execute(
+                        "UPDATE rows SET data = ?, payload = NULL WHERE sheet = ? AND row_key = ?",
+                        (json.dumps(merged), sheet, row_key),
+                    )
+                elif merged != data or payload is not None or dirty:
+                    conn.execute(
+                        "UPDATE rows SET data = ?, base = ?, payload = NULL, dirty = 0 WHERE sheet = ? AND row_key = ?",
+                        (json.dumps(merged), remote_base, sheet, row_key),
+                    )
+                    changed = changed or merged != data
+
+            for row_key, (data, base, payload, dirty) in local.items():
+                if row_key in remote_index or payload is not None:
+                    continue
+                # Removed from the sheet (archived or deleted by hand)
+                if dirty:
+                    conn.execute(
+                        "INSERT INTO conflicts (sheet, row_key, col, local_value, remote_value, resolved_to, at) "
+                        "VALUES (?, ?, '*', 'edited', 'deleted', 'remote', ?)",
+                        (sheet, row_key, _now()),
+                    )
+                conn.execute("DELETE FROM rows WHERE sheet = ? AND row_key = ?", (sheet, row_key))
+                changed = True
+
+            pending = conn.execute(
+                "SELECT row_key, payload, data, dirty FROM rows WHERE sheet = ? AND payload IS NOT NULL ORDER BY seq",
+                (sheet,),
+            ).fetchall()
+            local_headers = self.headers(sheet) if not remote_headers else remote_headers
+            if changed:
+                self._bump_version(conn)
+
+        # ---- push (outside the transaction; network calls) ----
+        # Rows edited while a push was in flight stay dirty, so the next pass pushes the newer value
+        if push_cells:
+            worksheet.batch_update(push_cells)
+            with self.transaction() as conn:
+                for row_key, data in pushed_rows.items():
+                    conn.execute(
+                        "UPDATE rows SET base = ?, dirty = CASE WHEN data = ? THEN 0 ELSE 1 END "
+                        "WHERE sheet = ? AND row_key = ?",
+                        (json.dumps({col: data.get(col, "") for col in editable}), json.dumps(data), sheet, row_key),
+                    )
+
+        if pending:
+            if not remote_headers and local_headers:
+                worksheet.append_row(local_headers)
+            worksheet.append_rows([json.loads(payload) for _, payload, _, _ in pending])
+            with self.transaction() as conn:
+                # The payload holds the values as queued; an edit made before or during
+                # the append (dirty at selection, or data changed since) still needs a push
+                conn.executemany(
+                    "UPDATE rows SET payload = NULL, dirty = CASE WHEN ? = 0 AND data = ? THEN 0 ELSE 1 END "
+                    "WHERE sheet = ? AND row_key = ?",
+                    [(dirty, data, sheet, row_key) for row_key, _, data, dirty in pending],
+                )
+
+
+# ================================
+# GOOGLE SHEETS CONNECTION
+# ================================
+def connect_worksheets(service_account_info, sheet_url, sheet_names=tuple(SHEET_CONFIG)):
+    """Opens the worksheets the replicator syncs; raises when Sheets is unreachable."""
+    import gspread
+    from google.oauth2.service_account import Credentials
+
+    scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
+    creds = Credentials.from_service_account_info(service_account_info, scopes=scope)
+    sh = gspread.authorize(creds).open_by_url(sheet_url)
+    return {name: sh.worksheet(name) for name in sheet_names}
+
+
+class Replicator:
+    """Background thread running `LocalMirror.replicate` every `interval` seconds."""
+
+    def __init__(self, mirror, connect, interval=SYNC_INTERVAL):
+        self.mirror = mirror
+        self.connect = connect
+        self.interval = interval
+        self.owner = f"{os.getpid()}-{id(self)}"
+        self._worksheets = None
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._first_pass = threading.Event()  # set once the first sync attempt finished
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="sheets-replicator", daemon=True)
+            self._thread.start()
+        return self
+
+    def sync_now(self, wait=False):
+        """
+        Runs a pass right away (blocking when `wait`). Otherwise records a
+        sync request in the mirror, which the lease holder picks up within
+        REQUEST_POLL_SECONDS even when it runs in another worker process.
+        """
+        if wait:
+            return self.sync_once()
+        self.mirror.request_sync()
+        self._wake.set()
+        return None
+
+    def wait_pushed(self, sheet, row_keys, since, timeout):
+        """
+        Waits up to `timeout` seconds for the rows `row_keys` (as returned by
+        `append_rows`) to reach `sheet`. Only a sync error recorded after
+        `since` (when the caller queued them) ends the wait early. Returns
+        {"pending_rows": rows of `row_keys` still queued, "last_error": that error or ""}.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            pending = self.mirror.pending_count(sheet, row_keys)
+            error = self.mirror.error_since(since) if pending else ""
+            if not pending or error or time.monotonic() >= deadline:
+                return {"pending_rows": pending, "last_error": error}
+            time.sleep(0.2)
+
+    def wait_first_pass(self, timeout=None):
+        """
+        Blocks until the first sync attempt finished (whether or not it
+        succeeded). When another replicator holds the lease, its first pass
+        counts: this one only waits until the mirror records a sync or error.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self._first_pass.is_set():
+            status = self.mirror.status()
+            if status["last_sync"] or status["last_error"]:
+                self._first_pass.set()
+                break
+            remaining = 0.25 if deadline is None else min(0.25, deadline - time.monotonic())
+            if remaining <= 0:
+                return False
+            self._first_pass.wait(remaining)
+        return True
+
+    def sync_once(self):
+        with self._lock:
+            attempted = False
+            try:
+                if not self.mirror.acquire_lease(self.owner):
+                    # The lease holder fills the mirror; wait_first_pass watches for that
+                    return False
+                attempted = True
+                if self._worksheets is None:
+                    self._worksheets = self.connect()
+                self.mirror.replicate(self._worksheets)
+                return True
+            except Exception as e:
+                # Reconnect on the next pass; local reads and writes carry on meanwhile
+                self._worksheets = None
+                self.mirror.record_error(e)
+                return False
+            finally:
+                if attempted:
+                    self._first_pass.set()
+
+    def _run(self):
+        while True:
+            started = time.time()
+            self.sync_once()
+            # Sleep until the interval is up, a local wake-up, or a request from another worker
+            deadline = time.monotonic() + self.interval
+            while not self._wake.wait(min(REQUEST_POLL_SECONDS, max(0.0, deadline - time.monotonic()))):
+                if time.monotonic() >= deadline or self.mirror.sync_requested_since(started):
+                    break
+            self._wake.clear()
+
+
+def describe_status(status):
+    """One-line sync status for the sidebar."""
+    pending = status["pending_rows"] + status["pending_edits"]
+    if status["last_error"]:
+        return f"🟠 Offline – {pending} change(s) waiting to sync. Last sync: {status['last_sync'] or 'never'}"
+    if pending:
+        return f"🔄 Syncing {pending} change(s)… Last sync: {status['last_sync'] or 'never'}"
+    return f"🟢 Synced with Google Sheets at {status['last_sync'] or 'never'}"
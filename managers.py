@@ -1,8 +1,14 @@
 import streamlit as st
-import pandas as pd
-import gspread
-from google.oauth2.service_account import Credentials
+import os
 from datetime import datetime
+from expiry_index import build_expiry_index_from_table
+from feedback_analytics import LOW_RATING, FeedbackAnalytics, summary_rows
+from items_archive import archived_before, read_archive
+from local_mirror import LocalMirror, Replicator, connect_worksheets, describe_status
+from shared_cache import SharedArrowCache, records_to_table, version_key
+from startup import preload_modules
+# NOTE: pandas / gspread are imported after login (or on background threads)
+# so the login page renders with Streamlit alone.
 
 # ================================
 # PAGE CONFIG
@@ -82,18 +88,29 @@ outlet_passwords = {
 SHEET_URL = "https://docs.google.com/spreadsheets/d/1MK5WDETIFCRes-c8X16JjrNdrlEpHwv9vHvb96VVtM0/edit#gid=0"
 SHEET_NAME = "Items"
 
-try:
-    scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-    creds = Credentials.from_service_account_info(st.secrets["google_service_account"], scopes=scope)
-    client = gspread.authorize(creds)
-    sheet = client.open_by_url(SHEET_URL).worksheet(SHEET_NAME)
-    sheets_connected = True
-except Exception as e:
-    st.error(f"⚠️ Google Sheets connection error: {e}")
-    sheets_connected = False
-
-if not sheets_connected:
-    st.stop()
+# The dashboard reads and edits the local SQLite mirror; the replicator keeps
+# it in sync with Google Sheets, so an API outage doesn't take the page down.
+@st.cache_resource
+def get_mirror():
+    return LocalMirror()
+
+@st.cache_resource
+def get_replicator():
+    service_account_info = dict(st.secrets["google_service_account"])
+    # The first sync runs on the replicator thread while the login page is shown
+    return Replicator(get_mirror(), lambda: connect_worksheets(service_account_info, SHEET_URL)).start()
+
+def warm_up():
+    """Starts Sheets replication and the dashboard's heavy imports in the background."""
+    try:
+        replicator = get_replicator()
+    except Exception as e:
+        st.error(f"⚠️ Google Sheets connection error: {e}")
+        replicator = None
+    preload_modules("pandas")
+    return replicator
+
+mirror = get_mirror()
 
 # ================================
 # SESSION STATE INIT
@@ -120,50 +137,162 @@ if not st.session_state.logged_in:
             st.error("❌ Invalid password")
 
     st.button("Login", on_click=login_callback)
+
+    # Login page is on screen: warm everything up while the user types
+    warm_up()
     st.stop()
 
+replicator = warm_up()
+
 # ================================
 # LOAD DATA
 # ================================
+import pandas as pd  # deferred until after login (usually already preloaded)
+
+def load_items_records():
+    """Items rows from the local mirror (no Sheets API call)."""
+    return mirror.records(SHEET_NAME)
+
+@st.cache_resource
+def get_shared_cache():
+    return SharedArrowCache()
+
+def load_items_table():
+    """
+    Host-wide Arrow snapshot of the Items mirror, built by the first worker
+    that sees a new mirror version and memory-mapped by the rest. Filter it
+    with `filter_items` / `filter_dates` and convert only what is shown.
+    """
+    return get_shared_cache().get_or_build(
+        "items", version_key(os.path.abspath(mirror.path), mirror.version()), lambda: records_to_table(load_items_records())
+    )
+
+def filter_items(table, outlet=None, form_type=None):
+    """Outlet (case-insensitive) and Form Type filters, evaluated on the Arrow table."""
+    import pyarrow.compute as pc
+
+    if outlet:
+        table = table.filter(pc.equal(pc.utf8_lower(table["Outlet"]), outlet.lower()))
+    if form_type:
+        table = table.filter(pc.equal(table["Form Type"], form_type))
+    return table
+
+def filter_dates(table, column, start, end):
+    """Rows whose `column` parses to a date in [start, end]; only that column is converted to pandas."""
+    import pyarrow as pa
+
+    dates = pd.to_datetime(table[column].to_pandas(), errors='coerce').dt.date
+    return table.filter(pa.array(((dates >= start) & (dates <= end)).to_numpy(dtype=bool)))
+
+@st.cache_resource
+def get_feedback_analytics():
+    """Feedback counters kept up to date by the mirror itself (see feedback_analytics.py)."""
+    return FeedbackAnalytics(mirror)
+
+@st.cache_resource(max_entries=2, show_spinner=False)
+def get_expiry_index(mirror_version):
+    """Per-outlet sorted expiry index, rebuilt from the shared snapshot only when the mirror changes."""
+    return build_expiry_index_from_table(load_items_table())
+
 st.title(f"📋 Manager Dashboard - {st.session_state.outlet_name}")
+if replicator is not None and mirror.status()["last_sync"] is None:
+    # Cold start on a new server: give the first sync a chance to fill the mirror
+    with st.spinner("Loading records from Google Sheets..."):
+        replicator.wait_first_pass(timeout=60)
+st.sidebar.caption(describe_status(mirror.status()))
+
+items_table = load_items_table()
+if "Outlet" not in items_table.column_names:
+    st.info("No records in the local mirror yet. They will appear after the first sync with Google Sheets.")
+    st.stop()
 
-data = sheet.get_all_records()
-df = pd.DataFrame(data)
+# ================================
+# NEAR-EXPIRY ALERTS
+# ================================
+is_logistics = st.session_state.outlet_name.lower() == "logistics"
+with st.expander("⏰ Near-Expiry Alerts", expanded=True):
+    alert_days = st.number_input("Expiring within (days)", min_value=0, max_value=365, value=7, step=1)
+    alert_rows = get_expiry_index(mirror.version()).digest_rows(
+        alert_days, outlet=None if is_logistics else st.session_state.outlet_name
+    )
+    if alert_rows:
+        st.warning(f"⚠️ {len(alert_rows)} item(s) expire in the next {alert_days} day(s).")
+        st.dataframe(pd.DataFrame(alert_rows), use_container_width=True, hide_index=True)
+    else:
+        st.success(f"✅ Nothing expires in the next {alert_days} day(s).")
+
+# ================================
+# CUSTOMER FEEDBACK (rolling ratings from the running counters)
+# ================================
+feedback = get_feedback_analytics()
+feedback_outlet = None if is_logistics else st.session_state.outlet_name
+feedback_stats = feedback.rolling((7, 30), outlet=feedback_outlet)
+feedback_alerts = feedback.alerts(outlet=feedback_outlet)
+low_ratings = feedback.low_ratings(7, outlet=feedback_outlet)
+with st.expander("⭐ Customer Feedback", expanded=bool(feedback_alerts or low_ratings)):
+    if not feedback_stats:
+        st.info("No customer feedback in the last 30 days.")
+    else:
+        for name, average, entries in feedback_alerts:
+            st.warning(f"⚠️ {name}: 7-day average rating is {average} ★ ({entries} entries).")
+        st.dataframe(pd.DataFrame(summary_rows(feedback_stats)), use_container_width=True, hide_index=True)
+        trend = pd.DataFrame(feedback.trend(30, 7, outlet=feedback_outlet), columns=["Day", "7-day average"])
+        st.line_chart(trend.set_index("Day"))
+        if low_ratings:
+            st.warning(f"⚠️ {len(low_ratings)} rating(s) of {LOW_RATING} ★ or less in the last 7 days.")
+            st.dataframe(pd.DataFrame(low_ratings), use_container_width=True, hide_index=True)
+        else:
+            st.success(f"✅ No ratings of {LOW_RATING} ★ or less in the last 7 days.")
 
-# Filter for outlet users (not logistics)
-if st.session_state.outlet_name.lower() != "logistics":
-    df = df[df["Outlet"].str.lower() == st.session_state.outlet_name.lower()]
+# Filter for outlet users (not logistics); filters run on the Arrow snapshot so
+# only the rows on screen are converted to pandas
+items_table = filter_items(items_table, outlet=None if is_logistics else st.session_state.outlet_name)
 
 # Convert dates to datetime
-if "Date Submitted" in df.columns:
-    df["Date Submitted"] = pd.to_datetime(df["Date Submitted"], errors='coerce').dt.date
-if "Expiry" in df.columns:
-    df["Expiry"] = pd.to_datetime(df["Expiry"], errors='coerce').dt.date
-if "Action Took Date" in df.columns:
-    df["Action Took Date"] = pd.to_datetime(df["Action Took Date"], errors='coerce').dt.date
+def convert_date_columns(frame):
+    for col in ["Date Submitted", "Expiry", "Action Took Date"]:
+        if col in frame.columns:
+            frame[col] = pd.to_datetime(frame[col], errors='coerce').dt.date
+    return frame
 
 # ================================
 # SIDEBAR FILTERS
 # ================================
 st.sidebar.header("Filters")
 
-form_types = df["Form Type"].dropna().unique().tolist()
+form_types = items_table["Form Type"].unique().drop_null().to_pylist()
 form_types.sort()
 form_types.insert(0, "All")
 selected_form_type = st.sidebar.selectbox("Form Type", form_types)
 if selected_form_type != "All":
-    df = df[df["Form Type"] == selected_form_type]
+    items_table = filter_items(items_table, form_type=selected_form_type)
 
 date_column = st.sidebar.selectbox("Filter by Date Column", ["Date Submitted", "Expiry"])
 col1, col2 = st.sidebar.columns(2)
 start_date = col1.date_input("From", value=datetime.today().date())
 end_date = col2.date_input("To", value=datetime.today().date())
-df = df[(df[date_column] >= start_date) & (df[date_column] <= end_date)]
+df = convert_date_columns(filter_dates(items_table, date_column, start_date, end_date).to_pandas())
 
 search_query = st.sidebar.text_input("Search")
 if search_query:
     df = df[df.apply(lambda row: row.astype(str).str.contains(search_query, case=False, na=False).any(), axis=1)]
 
+# ================================
+# ARCHIVED HISTORY (read-only, from Parquet)
+# ================================
+archive_df = pd.DataFrame()
+archive_cutoff = archived_before()
+if archive_cutoff and (date_column == "Expiry" or start_date < archive_cutoff):
+    archive_df = read_archive(
+        start_date, end_date, date_column,
+        outlet=None if is_logistics else st.session_state.outlet_name,
+        form_type=None if selected_form_type == "All" else selected_form_type,
+    )
+    if not archive_df.empty:
+        archive_df = convert_date_columns(archive_df)
+        if search_query:
+            archive_df = archive_df[archive_df.apply(lambda row: row.astype(str).str.contains(search_query, case=False, na=False).any(), axis=1)]
+
 # ================================
 # EDITABLE TABLES
 # ================================
@@ -201,56 +330,48 @@ else:
     # ================================
     def save_changes():
         try:
-            all_values = sheet.get_all_values()
-            headers = all_values[0]
-            outlet_idx = headers.index("Outlet")
-            item_idx = headers.index("Item Name")
+            records = mirror.records(SHEET_NAME, with_keys=True)
+            headers = mirror.headers(SHEET_NAME)
+
+            # Item Name -> mirror row keys (scoped to the outlet for outlet users)
+            rows_by_item = {}
+            for record in records:
+                if (st.session_state.outlet_name.lower() == "logistics" or
+                        str(record.get("Outlet", "")).lower() == st.session_state.outlet_name.lower()):
+                    rows_by_item.setdefault(record.get("Item Name"), []).append(record["_row_key"])
 
             today_date = datetime.now().strftime("%Y-%m-%d")
-            batch_updates = []  # collect updates here
+            updates = {}  # collect updates here: row key -> {column: value}
 
             if st.session_state.outlet_name.lower() == "logistics":
-                supplier_idx = headers.index("Supplier Name")
+                if "Supplier Name" not in headers:
+                    raise ValueError("'Supplier Name' is not a column of the Items sheet")
 
                 for i, row in edited_df.iterrows():
-                    for j, sheet_row in enumerate(all_values[1:], start=2):
-                        if sheet_row[item_idx] == row["Item Name"]:
-                            cell_ref = gspread.utils.rowcol_to_a1(j, supplier_idx + 1)
-                            batch_updates.append({
-                                "range": cell_ref,
-                                "values": [[row["Supplier Name"]]]
-                            })
-
-                if batch_updates:
-                    sheet.batch_update([{"range": u["range"], "values": u["values"]} for u in batch_updates])
+                    for row_key in rows_by_item.get(row["Item Name"], []):
+                        updates[row_key] = {"Supplier Name": row["Supplier Name"]}
+
+                if mirror.update_cells(SHEET_NAME, updates):
+                    if replicator is not None:
+                        replicator.sync_now()
                     st.success("✅ Supplier Name updated successfully!")
                 else:
                     st.info("No changes to update.")
 
             else:
-                action_idx = headers.index("Action Took")
-                date_idx = headers.index("Action Took Date") if "Action Took Date" in headers else None
+                if "Action Took" not in headers:
+                    raise ValueError("'Action Took' is not a column of the Items sheet")
 
                 for i, row in edited_df.iterrows():
-                    for j, sheet_row in enumerate(all_values[1:], start=2):
-                        if (sheet_row[item_idx] == row["Item Name"] and
-                            sheet_row[outlet_idx].lower() == st.session_state.outlet_name.lower()):
-                            # Action Took
-                            action_cell = gspread.utils.rowcol_to_a1(j, action_idx + 1)
-                            batch_updates.append({
-                                "range": action_cell,
-                                "values": [[row["Action Took"]]]
-                            })
-                            # Action Took Date
-                            if date_idx is not None:
-                                date_cell = gspread.utils.rowcol_to_a1(j, date_idx + 1)
-                                batch_updates.append({
-                                    "range": date_cell,
-                                    "values": [[today_date]]
-                                })
-
-                if batch_updates:
-                    sheet.batch_update([{"range": u["range"], "values": u["values"]} for u in batch_updates])
+                    for row_key in rows_by_item.get(row["Item Name"], []):
+                        # Action Took (+ Action Took Date)
+                        updates[row_key] = {"Action Took": row["Action Took"]}
+                        if "Action Took Date" in headers:
+                            updates[row_key]["Action Took Date"] = today_date
+
+                if mirror.update_cells(SHEET_NAME, updates):
+                    if replicator is not None:
+                        replicator.sync_now()
                     st.success("✅ Action Took updated successfully!")
                 else:
                     st.info("No changes to update.")
@@ -259,3 +380,11 @@ else:
             st.error(f"❌ Failed to update: {e}")
 
     st.button("💾 Submit Changes", on_click=save_changes)
+
+if not archive_df.empty:
+    st.markdown(f"### 📦 Archived Records (submitted before {archive_cutoff})")
+    st.caption("Archived rows are read-only.")
+    archive_view = archive_df
+    if not is_logistics:
+        archive_view = archive_view.drop(columns=["Action Took Date"], errors="ignore")
+    st.dataframe(archive_view, use_container_width=True, hide_index=True)
@@ -0,0 +1,132 @@
+"""
+Host-wide cache of Arrow tables shared by every Streamlit worker process.
+
+Each entry is an Arrow IPC file named `<name>-<version>.arrow` in
+SHARED_CACHE_DIR. The first process that needs a version builds it under an
+exclusive file lock and publishes it with an atomic rename. Every other
+process memory-maps the same file, so the data is read zero-copy and exists
+once in the page cache rather than once per worker.
+
+    cache = SharedArrowCache()
+    table = cache.get_or_build("catalog", version, build_catalog_table)
+
+Versions are opaque strings; use something that changes with the source
+(a file signature hash, the mirror's version counter, ...).
+"""
+import glob
+import hashlib
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: builds aren't serialised, the atomic rename still is
+    fcntl = None
+
+SHARED_CACHE_DIR = os.environ.get("SHARED_CACHE_DIR", ".shared_cache")
+
+
+def version_key(*parts):
+    """Short stable hash of `parts`, for use as a cache version."""
+    return hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()[:16]
+
+
+class _FileLock:
+    def __init__(self, path):
+        self.path = path
+        self.fh = None
+
+    def __enter__(self):
+        self.fh = open(self.path, "a+")
+        if fcntl is not None:
+            fcntl.flock(self.fh, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if fcntl is not None:
+            fcntl.flock(self.fh, fcntl.LOCK_UN)
+        self.fh.close()
+        return False
+
+
+class SharedArrowCache:
+    """Versioned, memory-mapped Arrow tables shared through a directory."""
+
+    def __init__(self, directory=SHARED_CACHE_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._open = {}  # name -> (version, table) mapped by this process
+        self._lock = threading.Lock()
+
+    def _path(self, name, version):
+        return os.path.join(self.directory, f"{name}-{version}.arrow")
+
+    def _map(self, path):
+        import pyarrow as pa
+
+        with pa.memory_map(path, "r") as source:
+            return pa.ipc.open_file(source).read_all()
+
+    def get(self, name, version):
+        """The table for (name, version) if some process already built it, else None."""
+        with self._lock:
+            current = self._open.get(name)
+            if current and current[0] == version:
+                return current[1]
+        try:
+            table = self._map(self._path(name, version))
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            self._open[name] = (version, table)
+        return table
+
+    def get_or_build(self, name, version, build):
+        """
+        Returns the table for (name, version), calling `build()` (which must
+        return a pyarrow.Table) only if no process on this host has built it.
+        """
+        table = self.get(name, version)
+        if table is not None:
+            return table
+
+        with _FileLock(os.path.join(self.directory, f"{name}.lock")):
+            # Another worker may have finished the build while we waited
+            table = self.get(name, version)
+            if table is not None:
+                return table
+            built = build()
+            self._write(name, version, built)
+            self._prune(name, keep=version)
+        table = self.get(name, version)
+        # A newer version may already have replaced ours; serve what we built
+        return built if table is None else table
+
+    def _write(self, name, version, table):
+        import pyarrow as pa
+
+        path = self._path(name, version)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+
+    def _prune(self, name, keep):
+        # Unlinking is safe for processes that still have an old version mapped
+        for path in glob.glob(os.path.join(self.directory, f"{name}-*.arrow")):
+            if path != self._path(name, keep):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+def records_to_table(records):
+    """Arrow table from a list of string-valued dicts (e.g. `LocalMirror.records`)."""
+    import pyarrow as pa
+
+    if not records:
+        return pa.table({})
+    columns = list(records[0])
+    return pa.table({col: pa.array([str(r.get(col, "")) for r in records], pa.string()) for col in columns})
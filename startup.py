@@ -0,0 +1,31 @@
+"""
+Cold-start helpers shared by variance.py and managers.py.
+
+The login page only needs Streamlit. Heavy modules (pandas, gspread, ...)
+are imported on a background thread while the user is typing, so neither
+the login page nor the first page after login waits on them.
+See benchmarks/bench_startup.py for the measurements.
+"""
+import importlib
+import threading
+
+_preloaded = set()
+_preload_lock = threading.Lock()
+
+
+def _import_all(names):
+    for name in names:
+        try:
+            importlib.import_module(name)
+        except Exception:
+            # The real import (and its error) happens again where the module is used
+            pass
+
+
+def preload_modules(*names):
+    """Imports `names` on a daemon thread, once per process. Never blocks."""
+    with _preload_lock:
+        pending = [name for name in names if name not in _preloaded]
+        _preloaded.update(pending)
+    if pending:
+        threading.Thread(target=_import_all, args=(pending,), name="module-preload", daemon=True).start()
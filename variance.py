@@ -1,8 +1,13 @@
 import streamlit as st
-import pandas as pd
+import time
 from datetime import datetime
-import gspread 
-from google.oauth2.service_account import Credentials 
+from cart import CART_COLUMNS, Cart
+from catalog import CatalogManager
+from duplicates import item_key, keys_from_records, prices_match
+from local_mirror import LocalMirror, Replicator, connect_worksheets, describe_status
+from startup import preload_modules
+# NOTE: pandas / gspread are imported lazily (catalog load, replication,
+# cart display) so the login page renders with Streamlit alone.
 
 # ==========================================
 # PAGE CONFIG
@@ -15,29 +20,27 @@ st.set_page_config(page_title="Outlet & Feedback Dashboard", layout="wide")
 # 1. Configuration - REPLACE WITH YOUR SHEET URL
 SHEET_URL = "https://docs.google.com/spreadsheets/d/1MK5WDETIFCRes-c8X16JjrNdrlEpHwv9vHvb96VVtM0/edit?gid=1883887055#gid=1883887055"
 ITEMS_SHEET_NAME = "Items"
+SUBMIT_SYNC_WAIT = 5  # seconds a submit waits for the rows to reach the sheet before reporting them as pending
 FEEDBACK_SHEET_NAME = "Feedback"
 
-# 2. Authorization
-try:
-    scope = ["https://spreadsheets.google.com/feeds",
-             "https://www.googleapis.com/auth/drive"]
-
-    # Load credentials from Streamlit Secrets (same as your first app)
-    creds = Credentials.from_service_account_info(
-        st.secrets["google_service_account"], scopes=scope
-    )
-
-    # Authorize client and open the spreadsheet
-    client = gspread.authorize(creds)
-    sh = client.open_by_url(SHEET_URL)
-    items_worksheet = sh.worksheet(ITEMS_SHEET_NAME) # Target for Outlet Dashboard data
-    feedback_worksheet = sh.worksheet(FEEDBACK_SHEET_NAME) # Target for Feedback data
-    
-    # Flag for successful connection
-    sheets_connected = True
-except Exception as e:
-    st.error(f"⚠️ Google Sheets Connection Error: Ensure your 'google_service_account' is correct and the sheet URL is valid. Error: {e}")
-    sheets_connected = False
+# 2. Local mirror + background replication
+# All reads and writes go to the local SQLite mirror; the replicator syncs it
+# with Google Sheets in the background, so an API outage doesn't block staff.
+# The replicator is started by warm_up() (see below) once the login page has
+# rendered; its first sync runs while the user types.
+@st.cache_resource
+def get_mirror():
+    return LocalMirror()
+
+@st.cache_resource
+def get_replicator():
+    service_account_info = dict(st.secrets["google_service_account"])
+    return Replicator(
+        get_mirror(),
+        lambda: connect_worksheets(service_account_info, SHEET_URL, [ITEMS_SHEET_NAME, FEEDBACK_SHEET_NAME]),
+    ).start()
+
+mirror = get_mirror()
 
 # ==========================================
 # CUSTOM STYLES (Existing - Removed custom radio CSS for cleaner st.feedback)
@@ -139,31 +142,42 @@ def inject_numeric_keyboard_script(target_label):
     st.markdown(script, unsafe_allow_html=True)
 
 # ==========================================
-# LOAD ITEM DATA (for auto-fill) (Existing)
+# LOAD ITEM DATA (for auto-fill)
+# ==========================================
+@st.cache_resource
+def get_catalog():
+    # Watches the app directory for new "ItemSearchList_*.xlsx" exports and
+    # loads / swaps them in from a background thread (see catalog.py)
+    return CatalogManager().start()
+
 # ==========================================
-@st.cache_data
-def load_item_data():
-    # NOTE: The actual file "alllist.xlsx" must be present in the directory 
-    file_path = "ItemSearchList_31102025_1159 (1).xlsx" 
+# BACKGROUND WARM-UP (non-blocking)
+# ==========================================
+def warm_up():
+    """Starts the catalog load, Sheets replication and heavy imports in the background."""
     try:
-        df = pd.read_excel(file_path)
-        # Ensure column names are clean
-        df.columns = df.columns.str.strip()
-        
-        # Check only critical columns needed for the app to run
-        required_cols = ["Item Bar Code", "Item Name", "LP Supplier"] 
-        for col in required_cols:
-            if col not in df.columns:
-                st.error(f"⚠️ Missing critical column: '{col}' in alllist.xlsx. Please check the file.")
-                return pd.DataFrame()
-        return df
-    except FileNotFoundError:
-        st.error(f"⚠️ Data file not found: {file_path}. Please ensure the file is in the application directory.")
+        replicator = get_replicator()
     except Exception as e:
-        st.error(f"⚠️ Error loading alllist.xlsx: {e}")
-    return pd.DataFrame()
+        st.error(f"⚠️ Google Sheets Connection Error: Ensure your 'google_service_account' is correct and the sheet URL is valid. Entries will be kept locally. Error: {e}")
+        replicator = None
+    preload_modules("pandas")
+    return get_catalog(), replicator
 
-item_data = load_item_data()
+# ==========================================
+# RECENT ITEMS INDEX (for duplicate detection)
+# ==========================================
+@st.cache_resource(max_entries=4, show_spinner=False)
+def _recent_item_keys(mirror_version, day):
+    # One shared frozenset per mirror version: lookups don't copy it, and a
+    # write anywhere just moves the next call to a new key (today's rows only)
+    try:
+        return keys_from_records(mirror.records_on_day(ITEMS_SHEET_NAME, day))
+    except Exception:
+        return frozenset()
+
+def load_recent_item_keys():
+    """Duplicate keys of rows already submitted today, current as of the mirror's latest change."""
+    return _recent_item_keys(mirror.version(), datetime.now().strftime("%Y-%m-%d"))
 
 # ==========================================
 # LOGIN SYSTEM (Existing)
@@ -183,10 +197,12 @@ for key in ["logged_in", "selected_outlet", "submitted_items",
              "staff_name"]: 
     
     if key not in st.session_state:
-        if key in ["submitted_items", "submitted_feedback"]:
+        if key == "submitted_items":
+            st.session_state[key] = Cart()
+        elif key == "submitted_feedback":
             st.session_state[key] = []
         elif key == "lookup_data":
-            st.session_state[key] = pd.DataFrame()
+            st.session_state[key] = None  # (item name, supplier) of the last catalog hit
         elif key == "barcode_found":
             st.session_state[key] = False 
         else:
@@ -209,7 +225,7 @@ def lookup_item_and_update_state():
     barcode = st.session_state.lookup_barcode_input
     
     # Reset lookup and previous item states
-    st.session_state.lookup_data = pd.DataFrame()
+    st.session_state.lookup_data = None
     st.session_state.barcode_value = barcode 
     st.session_state.item_name_input = ""
     st.session_state.supplier_input = ""
@@ -223,27 +239,26 @@ def lookup_item_and_update_state():
         st.toast("⚠️ Barcode cleared.", icon="❌")
         return
 
-    if not item_data.empty:
-        match = item_data[item_data["Item Bar Code"].astype(str).str.strip() == str(barcode).strip()]
-        
-        if not match.empty:
-            st.session_state.barcode_found = True
-            row = match.iloc[0]
-            
-            # 1. Prepare data for display table
-            df_display = row[["Item Name", "LP Supplier"]].to_frame().T
-            df_display.columns = ["Item Name", "Supplier"]
-            st.session_state.lookup_data = df_display.reset_index(drop=True)
-            
-            # 2. Automatically transfer details to the main state variables
-            st.session_state.item_name_input = str(row["Item Name"])
-            st.session_state.supplier_input = str(row["LP Supplier"])
-            
-            st.toast("✅ Item found. Details loaded.", icon="🔍")
-        else:
-            # Barcode not found 
-            st.session_state.barcode_found = False 
-            st.toast("⚠️ Barcode not found. Please enter item name and supplier manually.", icon="⚠️")
+    # Only waits on a cold start, if the first catalog load is still running
+    catalog.wait_ready(timeout=30)
+    match = catalog.lookup(barcode)
+
+    if match is not None:
+        st.session_state.barcode_found = True
+        item_name, supplier = match
+
+        # 1. Prepare data for display table
+        st.session_state.lookup_data = match
+
+        # 2. Automatically transfer details to the main state variables
+        st.session_state.item_name_input = item_name
+        st.session_state.supplier_input = supplier
+
+        st.toast("✅ Item found. Details loaded.", icon="🔍")
+    else:
+        # Barcode not found 
+        st.session_state.barcode_found = False 
+        st.toast("⚠️ Barcode not found. Please enter item name and supplier manually.", icon="⚠️")
 # ------------------------------------------------------------------
 
 # -------------------------------------------------
@@ -274,7 +289,7 @@ def process_item_entry(barcode, item_name, qty, cost, selling, expiry, supplier,
     expiry_display = expiry.strftime("%d-%b-%y") if expiry else ""
     gp = ((selling - cost) / cost * 100) if cost else 0
 
-    st.session_state.submitted_items.append({
+    new_item = {
         "Date Submitted": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), 
         "Form Type": form_type,
         "Barcode": barcode.strip(),
@@ -289,14 +304,35 @@ def process_item_entry(barcode, item_name, qty, cost, selling, expiry, supplier,
         "Remarks": remarks.strip(),
         "Outlet": outlet_name,
         "Staff Name": staff_name.strip() 
-    })
+    }
+
+    # --- Duplicate check: same outlet/barcode/form type/expiry/day ---
+    key = item_key(new_item)
+    cart = st.session_state.submitted_items
+    existing = cart.find(key)
+    same_price = next((item_id for item_id in existing if prices_match(cart.get(item_id), new_item)), None)
+    if same_price is not None:
+        merged = cart.merge(same_price, new_item)
+        st.toast(f"⚠️ Duplicate scan merged into the existing entry (Qty now {merged['Qty']}).", icon="🔁")
+    elif existing:
+        # Different prices: keep both entries rather than silently dropping one price
+        existing_item = cart.get(existing[-1])
+        cart.add(new_item)
+        st.toast(f"⚠️ {new_item['Item Name']} is already in the list at Cost {existing_item['Cost']} / "
+                 f"Selling {existing_item['Selling']}; added separately at Cost {new_item['Cost']} / "
+                 f"Selling {new_item['Selling']}. Delete the wrong one if needed.", icon="⚠️")
+    else:
+        cart.add(new_item)
+        if key in load_recent_item_keys():
+            st.toast("⚠️ This item was already submitted today for this expiry. Check before submitting.", icon="⚠️")
 
     # --- CLEAR ONLY THE NON-FORM/NON-ITEM STATE VARIABLES ---
     st.session_state.barcode_value = ""          
-    st.session_state.lookup_data = pd.DataFrame()
+    st.session_state.lookup_data = None
     st.session_state.barcode_found = False
     
-    st.toast("✅ Added to list successfully!", icon="➕")
+    if not existing:
+        st.toast("✅ Added to list successfully!", icon="➕")
     return True
 # -------------------------------------------------
 
@@ -304,32 +340,44 @@ def process_item_entry(barcode, item_name, qty, cost, selling, expiry, supplier,
 # -------------------------------------------------
 # --- Function to Submit ALL Collected Data to Google Sheets ---
 # -------------------------------------------------
-def submit_all_items_to_sheets():
-    """Takes all items in session_state and appends them to the Items Google Sheet."""
-    if not sheets_connected:
-        st.error("Cannot submit: Google Sheets not connected.")
-        return
+def submit_all_items_to_sheets(allow_duplicates=False):
+    """Takes all items in session_state and queues them for the Items Google Sheet via the local mirror."""
+    # The cart already merges same-key entries; check them against today's sheet rows
+    # (after the first sync on a cold start, so the mirror has them)
+    if replicator is not None:
+        replicator.wait_first_pass(timeout=30)
+    items = st.session_state.submitted_items.items()
+    recent_keys = load_recent_item_keys()
+    already_submitted = [item for item in items if item_key(item) in recent_keys]
+    if already_submitted and not allow_duplicates:
+        names = ", ".join(f"{item['Item Name']} ({item['Barcode']})" for item in already_submitted)
+        st.warning(f"⚠️ {len(already_submitted)} item(s) were already submitted today: {names}. "
+                   "Remove them or tick 'Submit duplicates anyway' to continue.")
+        return False
 
-    df_to_upload = pd.DataFrame(st.session_state.submitted_items)
-    
     # Prepare data rows for gspread
-    headers = list(df_to_upload.columns)
-    
-    try:
-        current_headers = items_worksheet.row_values(1)
-        if not current_headers:
-             items_worksheet.append_row(headers)
-    except Exception as e:
-        st.error(f"Error checking/writing headers to '{ITEMS_SHEET_NAME}': {e}")
-        return
-
-    # Convert DataFrame to a list of lists (rows)
-    data_rows = df_to_upload.values.tolist()
+    headers = list(CART_COLUMNS)
+    data_rows = st.session_state.submitted_items.rows()
     
     try:
-        # Append all rows at once for efficiency
-        items_worksheet.append_rows(data_rows) 
-        st.success(f"✅ Successfully submitted {len(st.session_state.submitted_items)} items to Google Sheet: '{ITEMS_SHEET_NAME}'!")
+        # Write locally, then wake the replicator to append them to the sheet
+        queued_at = time.time()
+        row_keys = mirror.append_rows(ITEMS_SHEET_NAME, headers, data_rows)
+        if replicator is not None:
+            replicator.sync_now()
+            # Only this submit's rows, and only errors from passes after it was queued
+            status = replicator.wait_pushed(ITEMS_SHEET_NAME, row_keys, queued_at, SUBMIT_SYNC_WAIT)
+        else:
+            status = {"pending_rows": len(row_keys), "last_error": ""}
+        # Toasts survive the st.rerun() that follows a successful submit
+        if replicator is not None and not status["pending_rows"]:
+            st.toast(f"✅ Successfully submitted {len(items)} items to Google Sheet: '{ITEMS_SHEET_NAME}'!", icon="✅")
+        elif replicator is None or status["last_error"]:
+            st.toast(f"⚠️ Saved {len(items)} items locally. Google Sheets is unreachable right now; "
+                     f"{status['pending_rows']} row(s) pending sync will be sent automatically.", icon="⚠️")
+        else:
+            st.toast(f"💾 Saved {len(items)} items locally; {status['pending_rows']} row(s) pending sync "
+                     f"to Google Sheet '{ITEMS_SHEET_NAME}'.", icon="💾")
         return True
     except Exception as e:
         st.error(f"❌ Error submitting items to Google Sheet: {e}")
@@ -340,29 +388,18 @@ def submit_all_items_to_sheets():
 # --- Function to Submit Single Feedback to Google Sheets ---
 # -------------------------------------------------
 def submit_feedback_to_sheets(feedback_entry):
-    """Appends a single feedback entry (dictionary) to the Feedback Google Sheet."""
-    if not sheets_connected:
-        st.error("Cannot submit: Google Sheets not connected.")
-        return False
-        
+    """Queues a single feedback entry (dictionary) for the Feedback Google Sheet via the local mirror."""
     # Get header row (in the order you want)
     headers = list(feedback_entry.keys())
-    
-    # Check if headers exist in the sheet
-    try:
-        current_headers = feedback_worksheet.row_values(1)
-        if not current_headers:
-             feedback_worksheet.append_row(headers)
-    except Exception as e:
-        st.error(f"Error checking/writing headers to '{FEEDBACK_SHEET_NAME}': {e}")
-        return False
 
     # Get values in the order of the keys (headers)
     data_row = list(feedback_entry.values())
     
     try:
-        # Append the single row
-        feedback_worksheet.append_row(data_row) 
+        # Write locally; the replicator appends it to the sheet
+        mirror.append_rows(FEEDBACK_SHEET_NAME, headers, [data_row])
+        if replicator is not None:
+            replicator.sync_now()
         return True
     except Exception as e:
         st.error(f"❌ Error submitting feedback to Google Sheet: {e}")
@@ -387,12 +424,20 @@ if not st.session_state.logged_in:
         else:
             st.error("❌ Invalid username or password")
 
+    # Login page is on screen: warm everything up while the user types
+    warm_up()
+
 else:
+    catalog, replicator = warm_up()
+
     # NOTE: The CUSTOM_RATING_CSS is no longer necessary but is commented out
     # to show that the new widget is used.
     # st.markdown(CUSTOM_RATING_CSS, unsafe_allow_html=True) 
     
     page = st.sidebar.radio("📌 Select Page", ["Outlet Dashboard", "Customer Feedback"])
+    st.sidebar.caption(describe_status(mirror.status()))
+    if catalog.wait_ready(timeout=0) and catalog.last_error:
+        st.error(f"⚠️ {catalog.last_error}")
 
     # ==========================================
     # OUTLET DASHBOARD
@@ -440,9 +485,10 @@ else:
                 )
 
         # --- 2. Item Details Display Panel (Existing) ---
-        if not st.session_state.lookup_data.empty:
+        if st.session_state.lookup_data is not None:
+            found_name, found_supplier = st.session_state.lookup_data
             st.markdown("### 🔍 Found Item Details")
-            st.dataframe(st.session_state.lookup_data, use_container_width=True, hide_index=True)
+            st.dataframe({"Item Name": [found_name], "Supplier": [found_supplier]}, use_container_width=True, hide_index=True)
         
         # --- 2b. Manual Entry Fallback (Existing) ---
         if st.session_state.barcode_value.strip() and not st.session_state.barcode_found:
@@ -539,33 +585,36 @@ else:
         # Displaying and managing the list
         if st.session_state.submitted_items:
             st.markdown("### 🧾 Items Added")
-            df = pd.DataFrame(st.session_state.submitted_items)
-            st.dataframe(df, use_container_width=True, hide_index=True)
+            st.dataframe(st.session_state.submitted_items.frame(), use_container_width=True)
 
             col_submit, col_delete = st.columns([1, 1])
             with col_submit:
+                allow_duplicates = st.checkbox("Submit duplicates anyway", value=False)
                 if st.button("📤 Submit All to Google Sheets", type="primary"): 
-                    if submit_all_items_to_sheets(): 
+                    if submit_all_items_to_sheets(allow_duplicates): 
                         # FINAL RESET OF ITEM LOOKUP DATA AND STAFF NAME
-                        st.session_state.submitted_items = []
+                        st.session_state.submitted_items.clear()
                         st.session_state.barcode_value = ""
                         st.session_state.item_name_input = ""
                         st.session_state.supplier_input = ""
                         st.session_state.barcode_found = False
                         st.session_state.temp_item_name_manual = "" 
                         st.session_state.temp_supplier_manual = "" 
-                        st.session_state.lookup_data = pd.DataFrame() 
+                        st.session_state.lookup_data = None 
                         st.session_state.staff_name = "" 
                         st.rerun() 
 
             with col_delete:
-                options = [f"{i+1}. {item['Item Name']} ({item['Qty']} pcs)" for i, item in enumerate(st.session_state.submitted_items)]
-                if options:
-                    to_delete = st.selectbox("Select Item to Delete", ["Select item to remove..."] + options)
-                    if to_delete != "Select item to remove...":
+                cart = st.session_state.submitted_items
+                if cart:
+                    to_delete = st.selectbox(
+                        "Select Item to Delete",
+                        [None] + cart.ids(),
+                        format_func=lambda item_id: "Select item to remove..." if item_id is None else cart.label(item_id),
+                    )
+                    if to_delete is not None:
                         if st.button("❌ Delete Selected", type="secondary"):
-                            index = options.index(to_delete) 
-                            st.session_state.submitted_items.pop(index)
+                            cart.remove(to_delete)
                             st.success("✅ Item removed")
                             st.rerun()
 